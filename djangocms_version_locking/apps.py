@@ -7,4 +7,5 @@ class VersionLockingConfig(AppConfig):
     verbose_name = _("django CMS Version Locking")
 
     def ready(self):
+        from . import cache  # noqa: F401
         from .monkeypatch import checks, cms_toolbars, models  # noqa: F401
@@ -0,0 +1,271 @@
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.signals import request_finished, request_started
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from asgiref.local import Local
+from asgiref.sync import sync_to_async
+
+from .conf import VERSION_LOCKING_CACHE_ALIAS, VERSION_LOCKING_CACHE_TIMEOUT
+from .models import VersionLock
+
+
+# Returned by get_cached_lock when nothing is known about a content
+# object, None is a valid cached value meaning "not locked"
+MISSING = object()
+
+_request_cache = Local()
+
+
+@receiver(request_started, dispatch_uid="djangocms_version_locking_enable_request_cache")
+def enable_request_cache(**kwargs):
+    """Start a fresh lock cache for the request being processed
+    """
+    _request_cache.locks = {}
+
+
+@receiver(request_finished, dispatch_uid="djangocms_version_locking_clear_request_cache")
+def clear_request_cache(**kwargs):
+    """Drop the lock cache at the end of the request, outside of
+    a request nothing is cached
+    """
+    _request_cache.locks = None
+
+
+def _get_request_locks():
+    return getattr(_request_cache, "locks", None)
+
+
+def get_content_cache_key(content):
+    return ContentType.objects.get_for_model(content).pk, content.pk
+
+
+# Content type ids of the models looked up by aget_content_cache_key
+_content_type_ids = {}
+
+
+async def aget_content_cache_key(content):
+    """Async counterpart of get_content_cache_key, the content type of a
+    model is only fetched from the database once
+    """
+    model = content._meta.concrete_model
+    content_type_id = _content_type_ids.get(model)
+    if content_type_id is None:
+        content_type = await sync_to_async(ContentType.objects.get_for_model)(model)
+        content_type_id = _content_type_ids[model] = content_type.pk
+    return content_type_id, content.pk
+
+
+def get_version_cache_key(version):
+    return version.content_type_id, version.object_id
+
+
+def get_cached_lock(key):
+    """Return the lock cached for the current request or MISSING
+    """
+    locks = _get_request_locks()
+    if locks is None:
+        return MISSING
+    return locks.get(key, MISSING)
+
+
+def set_cached_lock(key, lock):
+    locks = _get_request_locks()
+    if locks is not None:
+        locks[key] = lock
+
+
+def invalidate_cached_lock(key):
+    locks = _get_request_locks()
+    if locks is not None:
+        locks.pop(key, None)
+
+
+# The shared cache maps both content objects and version ids to their lock.
+# Locks carry the content of their version, so a lock change invalidates
+# both entries, whichever way the lock was written.
+
+def _get_shared_cache():
+    if not VERSION_LOCKING_CACHE_ALIAS:
+        return None
+    return caches[VERSION_LOCKING_CACHE_ALIAS]
+
+
+def shared_cache_is_enabled():
+    return _get_shared_cache() is not None
+
+
+def _get_shared_content_key(key):
+    return "djangocms_version_locking:v2:content:{}:{}".format(*key)
+
+
+def _get_shared_version_key(version_id):
+    return "djangocms_version_locking:v2:version:{}".format(version_id)
+
+
+def _get_owner_fields():
+    """Fields of the lock owner kept in the shared cache, enough to name them
+    """
+    user_model = get_user_model()
+    names = {user_model.USERNAME_FIELD, 'first_name', 'last_name'}
+    return [field for field in user_model._meta.concrete_fields if field.primary_key or field.name in names]
+
+
+def _pack_lock(lock):
+    """Reduce a lock to plain values, pickling the instance would also store
+    its owner's whole row and whatever objects are cached on it
+    """
+    if lock is None:
+        return None
+    owner = lock.created_by
+    return (
+        tuple(getattr(lock, field.attname) for field in VersionLock._meta.concrete_fields),
+        tuple(getattr(owner, field.attname) for field in _get_owner_fields()),
+    )
+
+
+def _unpack_lock(packed):
+    """Rebuild a lock and its owner from _pack_lock, the other fields of the
+    owner are deferred
+    """
+    if packed is None:
+        return None
+    lock_values, owner_values = packed
+    user_model = get_user_model()
+    lock = VersionLock.from_db(
+        router.db_for_read(VersionLock),
+        [field.attname for field in VersionLock._meta.concrete_fields],
+        lock_values,
+    )
+    owner = user_model.from_db(
+        router.db_for_read(user_model),
+        [field.attname for field in _get_owner_fields()],
+        owner_values,
+    )
+    VersionLock.created_by.field.set_cached_value(lock, owner)
+    return lock
+
+
+def _get_shared_lock(cache_key):
+    shared_cache = _get_shared_cache()
+    if shared_cache is None:
+        return MISSING
+    # Locks are wrapped in a tuple to tell a cached None from a cache miss
+    entry = shared_cache.get(cache_key)
+    if entry is None:
+        return MISSING
+    return _unpack_lock(entry[0])
+
+
+def _set_shared_lock(cache_key, lock):
+    shared_cache = _get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.set(cache_key, (_pack_lock(lock), ), VERSION_LOCKING_CACHE_TIMEOUT)
+
+
+async def _aget_shared_lock(cache_key):
+    shared_cache = _get_shared_cache()
+    if shared_cache is None:
+        return MISSING
+    entry = await shared_cache.aget(cache_key)
+    if entry is None:
+        return MISSING
+    return _unpack_lock(entry[0])
+
+
+async def _aset_shared_lock(cache_key, lock):
+    shared_cache = _get_shared_cache()
+    if shared_cache is not None:
+        await shared_cache.aset(cache_key, (_pack_lock(lock), ), VERSION_LOCKING_CACHE_TIMEOUT)
+
+
+def get_shared_version_lock(version_id):
+    """Return the lock of a version from the shared cache or MISSING
+    """
+    return _get_shared_lock(_get_shared_version_key(version_id))
+
+
+def set_shared_version_lock(version_id, lock):
+    _set_shared_lock(_get_shared_version_key(version_id), lock)
+
+
+def get_shared_content_lock(key):
+    """Return the lock of a content object from the shared cache or MISSING
+    """
+    return _get_shared_lock(_get_shared_content_key(key))
+
+
+def set_shared_content_lock(key, lock):
+    _set_shared_lock(_get_shared_content_key(key), lock)
+
+
+async def aget_shared_version_lock(version_id):
+    return await _aget_shared_lock(_get_shared_version_key(version_id))
+
+
+async def aset_shared_version_lock(version_id, lock):
+    await _aset_shared_lock(_get_shared_version_key(version_id), lock)
+
+
+async def aget_shared_content_lock(key):
+    return await _aget_shared_lock(_get_shared_content_key(key))
+
+
+async def aset_shared_content_lock(key, lock):
+    await _aset_shared_lock(_get_shared_content_key(key), lock)
+
+
+def _delete_shared_keys(keys):
+    shared_cache = _get_shared_cache()
+    if shared_cache is None:
+        return
+    shared_cache.delete_many(keys)
+    # A concurrent reader may cache the state from before the transaction
+    # commits, drop the keys again once it has
+    transaction.on_commit(lambda: shared_cache.delete_many(keys))
+
+
+def invalidate_version_lock(version):
+    """Forget everything cached about the lock of a version
+    """
+    key = get_version_cache_key(version)
+    invalidate_cached_lock(key)
+    _delete_shared_keys([_get_shared_content_key(key), _get_shared_version_key(version.pk)])
+
+
+def invalidate_lock(instance, **kwargs):
+    """Forget the cached state of a lock that has been written outside of
+    the lock helpers
+    """
+    locks = _get_request_locks()
+    if locks is not None:
+        locks.clear()
+    keys = [_get_shared_version_key(instance.version_id)]
+    if instance.content_type_id is not None:
+        keys.append(_get_shared_content_key((instance.content_type_id, instance.object_id)))
+    _delete_shared_keys(keys)
+
+
+def connect_lock_signals():
+    """Invalidate the shared cache when locks are written through the ORM.
+    A post_delete receiver stops Django from deleting locks without loading
+    them first, they are only connected when the shared cache is used.
+    """
+    post_save.connect(
+        invalidate_lock, sender=VersionLock, dispatch_uid="djangocms_version_locking_invalidate_lock_on_save",
+    )
+    post_delete.connect(
+        invalidate_lock, sender=VersionLock, dispatch_uid="djangocms_version_locking_invalidate_lock_on_delete",
+    )
+
+
+def disconnect_lock_signals():
+    post_save.disconnect(sender=VersionLock, dispatch_uid="djangocms_version_locking_invalidate_lock_on_save")
+    post_delete.disconnect(sender=VersionLock, dispatch_uid="djangocms_version_locking_invalidate_lock_on_delete")
+
+
+if VERSION_LOCKING_CACHE_ALIAS:
+    connect_lock_signals()
@@ -1,4 +1,3 @@
-from django.template.loader import render_to_string
 from django.utils.html import format_html
 
 from cms.app_base import CMSAppConfig, CMSAppExtension
@@ -7,13 +6,15 @@ from djangocms_alias.models import AliasContent
 from djangocms_versioning.constants import DRAFT
 
 from djangocms_version_locking.helpers import version_is_locked
+from djangocms_version_locking.utils import render_cached_fragment
 
 
 def add_alias_version_lock(obj, field):
+    # The versions and their locks are prefetched by the changelist queryset
     version = obj.versions.all()[0]
     lock_icon = ""
     if version.state == DRAFT and version_is_locked(version):
-        lock_icon = render_to_string("djangocms_version_locking/admin/locked_mixin_icon.html")
+        lock_icon = render_cached_fragment("djangocms_version_locking/admin/locked_mixin_icon.html")
     return format_html(
         "{is_locked}{field_value}",
         is_locked=lock_icon,
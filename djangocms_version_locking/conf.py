@@ -4,3 +4,85 @@ from django.conf import settings
 EMAIL_NOTIFICATIONS_FAIL_SILENTLY = getattr(
     settings, "EMAIL_NOTIFICATIONS_FAIL_SILENTLY", False
 )
+
+# Queue unlock notifications in the outbox table instead of sending them
+# during the request, the send_unlock_notifications command delivers them
+EMAIL_NOTIFICATIONS_USE_OUTBOX = getattr(
+    settings, "EMAIL_NOTIFICATIONS_USE_OUTBOX", False
+)
+
+EMAIL_NOTIFICATIONS_BATCH_SIZE = getattr(
+    settings, "EMAIL_NOTIFICATIONS_BATCH_SIZE", 100
+)
+
+EMAIL_NOTIFICATIONS_MAX_ATTEMPTS = getattr(
+    settings, "EMAIL_NOTIFICATIONS_MAX_ATTEMPTS", 5
+)
+
+# Seconds to wait before retrying a failed notification, doubled on every attempt
+EMAIL_NOTIFICATIONS_RETRY_DELAY = getattr(
+    settings, "EMAIL_NOTIFICATIONS_RETRY_DELAY", 60
+)
+
+# Seconds the notifications claimed by a send_unlock_notifications worker are
+# hidden from the other workers, they are sent again once it has passed when
+# the worker stopped before recording their delivery
+EMAIL_NOTIFICATIONS_CLAIM_TIMEOUT = getattr(
+    settings, "EMAIL_NOTIFICATIONS_CLAIM_TIMEOUT", 300
+)
+
+# Consecutive failures after which dispatching pauses for the cooldown in seconds
+EMAIL_NOTIFICATIONS_CIRCUIT_BREAKER_THRESHOLD = getattr(
+    settings, "EMAIL_NOTIFICATIONS_CIRCUIT_BREAKER_THRESHOLD", 5
+)
+
+EMAIL_NOTIFICATIONS_CIRCUIT_BREAKER_COOLDOWN = getattr(
+    settings, "EMAIL_NOTIFICATIONS_CIRCUIT_BREAKER_COOLDOWN", 300
+)
+
+# Seconds unlock notifications wait in the outbox to be coalesced into a
+# single digest email per recipient, requires the outbox
+EMAIL_NOTIFICATIONS_DIGEST_WINDOW = getattr(
+    settings, "EMAIL_NOTIFICATIONS_DIGEST_WINDOW", None
+)
+
+# Alias of the Django cache used to share lock lookups between processes,
+# the shared cache is disabled when not set
+VERSION_LOCKING_CACHE_ALIAS = getattr(
+    settings, "VERSION_LOCKING_CACHE_ALIAS", None
+)
+
+# Seconds a cached lock lookup is kept, this bounds how long a lock change
+# made without going through the ORM (raw SQL, QuerySet.update) can go unseen
+VERSION_LOCKING_CACHE_TIMEOUT = getattr(
+    settings, "VERSION_LOCKING_CACHE_TIMEOUT", 60
+)
+
+# Seconds after which a lock expires and is released by the
+# release_expired_locks command, locks never expire when not set
+VERSION_LOCKING_LOCK_TTL = getattr(
+    settings, "VERSION_LOCKING_LOCK_TTL", None
+)
+
+# Number of expired locks released in one transaction
+VERSION_LOCKING_EXPIRY_BATCH_SIZE = getattr(
+    settings, "VERSION_LOCKING_EXPIRY_BATCH_SIZE", 100
+)
+
+# Dotted path of the broker lock events are published to, for example
+# "djangocms_version_locking.events.InMemoryBroker", events are disabled when not set
+VERSION_LOCKING_EVENT_BROKER = getattr(
+    settings, "VERSION_LOCKING_EVENT_BROKER", None
+)
+
+# Seconds between the keepalive comments sent to idle lock event streams
+VERSION_LOCKING_EVENT_KEEPALIVE = getattr(
+    settings, "VERSION_LOCKING_EVENT_KEEPALIVE", 15
+)
+
+# Seconds after which lock event streams are closed, browsers reconnect on
+# their own. Before Django 5.0 a stream isn't stopped when its client goes
+# away, this bounds how long the stream of a closed page is kept open.
+VERSION_LOCKING_EVENT_STREAM_TIMEOUT = getattr(
+    settings, "VERSION_LOCKING_EVENT_STREAM_TIMEOUT", 300
+)
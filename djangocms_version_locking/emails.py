@@ -1,40 +1,207 @@
+from collections import defaultdict
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils.encoding import force_str
 from django.utils.translation import gettext_lazy as _
 
 from cms.toolbar.utils import get_object_preview_url
-from cms.utils import get_current_site
 
-from .helpers import send_email
-from .utils import get_absolute_url
+from .conf import (
+    EMAIL_NOTIFICATIONS_FAIL_SILENTLY,
+    EMAIL_NOTIFICATIONS_USE_OUTBOX,
+)
+from .helpers import (
+    get_email_message,
+    remove_version_lock,
+    remove_version_locks,
+    send_email,
+)
+from .models import UnlockNotification
+from .utils import get_absolute_url, get_site_context
+
 
+def get_unlock_notification(version, unlocking_user, site_context=None):
+    """Build the (unsaved) notification for the author of an unlocked version,
+    None is returned when the unlocking user is the author or the author has
+    no email address
 
-def notify_version_author_version_unlocked(version, unlocking_user):
+    :param site_context: SiteContext of the site the notification is sent
+        from, batch senders pass it to avoid resolving the site per message
+    """
     # If the unlocking user is the current author, don't send a notification email
     if version.created_by == unlocking_user:
-        return
+        return None
+    # Nor when the author has no email address to send it to
+    if not version.created_by.email:
+        return None
+
+    if site_context is None:
+        site_context = get_site_context()
+    return UnlockNotification(
+        recipient=version.created_by.email,
+        site_name=site_context.name,
+        title=force_str(version.content),
+        version_link=get_absolute_url(
+            get_object_preview_url(version.content),
+            site=site_context,
+        ),
+        # If the users name is available use it, otherwise use their username
+        unlocked_by=unlocking_user.get_full_name() or unlocking_user.username,
+    )
 
-    # If the users name is available use it, otherwise use their username
-    username = unlocking_user.get_full_name() or unlocking_user.username
 
-    site = get_current_site()
-    recipients = [version.created_by.email]
+def _get_unlock_notification_email(notification):
     subject = "[Django CMS] ({site_name}) {title} - {description}".format(
-        site_name=site.name,
-        title=version.content,
+        site_name=notification.site_name,
+        title=notification.title,
         description=_("Unlocked"),
     )
-    version_url = get_absolute_url(
-        get_object_preview_url(version.content)
+    template_context = {
+        'version_link': notification.version_link,
+        'by_user': notification.unlocked_by,
+    }
+    return {
+        'recipients': [notification.recipient],
+        'subject': subject,
+        'template': 'unlock-notification.txt',
+        'template_context': template_context,
+    }
+
+
+def get_unlock_notification_message(notification):
+    """Render the email message of an unlock notification
+    """
+    return get_email_message(**_get_unlock_notification_email(notification))
+
+
+def get_unlock_digest_message(notifications):
+    """Render a single email listing the unlock notifications of one recipient
+    """
+    notification = notifications[0]
+    subject = "[Django CMS] ({site_name}) {count} {description}".format(
+        site_name=notification.site_name,
+        count=len(notifications),
+        description=_("versions unlocked"),
     )
+    return get_email_message(
+        recipients=[notification.recipient],
+        subject=subject,
+        template='unlock-digest-notification.txt',
+        template_context={'notifications': notifications},
+    )
+
+
+def notify_version_author_version_unlocked(version, unlocking_user, site_context=None):
+    notification = get_unlock_notification(version, unlocking_user, site_context=site_context)
+    if notification is None:
+        return
+
+    # The outbox is drained by the send_unlock_notifications command,
+    # saving it in the caller's transaction ties it to the unlock itself
+    if EMAIL_NOTIFICATIONS_USE_OUTBOX:
+        notification.save()
+        return
 
     # Prepare and send the email
+    status = send_email(**_get_unlock_notification_email(notification))
+    return status
+
+
+def unlock_version_and_notify_author(version, unlocking_user):
+    """Unlock a version and notify its author. A notification queued in the
+    outbox is saved in the transaction of the unlock, an email is only sent
+    once the unlock is saved so that a mail error can't undo it
+    """
+    with transaction.atomic():
+        remove_version_lock(version)
+        if EMAIL_NOTIFICATIONS_USE_OUTBOX:
+            notify_version_author_version_unlocked(version, unlocking_user)
+
+    if not EMAIL_NOTIFICATIONS_USE_OUTBOX:
+        notify_version_author_version_unlocked(version, unlocking_user)
+
+
+def notify_version_authors_versions_unlocked(versions, unlocking_user):
+    """Notify the authors of many unlocked versions at once, the emails are
+    sent over a single mail connection
+    """
+    site_context = get_site_context()
+    notifications = [
+        notification for notification in (
+            get_unlock_notification(version, unlocking_user, site_context=site_context)
+            for version in versions
+        )
+        if notification is not None
+    ]
+    if not notifications:
+        return 0
+
+    if EMAIL_NOTIFICATIONS_USE_OUTBOX:
+        UnlockNotification.objects.bulk_create(notifications)
+        return 0
+
+    connection = get_connection(fail_silently=EMAIL_NOTIFICATIONS_FAIL_SILENTLY)
+    return connection.send_messages([
+        get_unlock_notification_message(notification) for notification in notifications
+    ])
+
+
+def unlock_versions_and_notify_authors(versions, unlocking_user):
+    """Unlock many versions and notify their authors, the notifications
+    are queued or emailed as by unlock_version_and_notify_author
+    """
+    with transaction.atomic():
+        # Remove all the locks with a single query
+        remove_version_locks(versions)
+        if EMAIL_NOTIFICATIONS_USE_OUTBOX:
+            notify_version_authors_versions_unlocked(versions, unlocking_user)
+
+    if not EMAIL_NOTIFICATIONS_USE_OUTBOX:
+        # Send the email notifications over a single connection
+        notify_version_authors_versions_unlocked(versions, unlocking_user)
+
+
+def get_lock_expired_message(recipient, versions, site_context):
+    """Render a single email listing the versions of one lock owner whose
+    lock has expired
+    """
+    subject = "[Django CMS] ({site_name}) {count} {description}".format(
+        site_name=site_context.name,
+        count=len(versions),
+        description=_("draft locks expired"),
+    )
     template_context = {
-        'version_link': version_url,
-        'by_user': username,
+        'versions': [
+            {
+                'title': force_str(version.content),
+                'version_link': get_absolute_url(get_object_preview_url(version.content), site=site_context),
+            }
+            for version in versions
+        ],
     }
-    status = send_email(
-        recipients=recipients,
+    return get_email_message(
+        recipients=[recipient],
         subject=subject,
-        template='unlock-notification.txt',
+        template='lock-expired-notification.txt',
         template_context=template_context,
     )
-    return status
+
+
+def notify_lock_owners_locks_expired(locks):
+    """Notify the owners of expired locks, every owner gets a single email
+    listing their versions and the emails are sent over a single mail connection
+    """
+    versions_by_recipient = defaultdict(list)
+    for lock in locks:
+        if lock.created_by.email:
+            versions_by_recipient[lock.created_by.email].append(lock.version)
+    if not versions_by_recipient:
+        return 0
+
+    site_context = get_site_context()
+    connection = get_connection(fail_silently=EMAIL_NOTIFICATIONS_FAIL_SILENTLY)
+    return connection.send_messages([
+        get_lock_expired_message(recipient, versions, site_context)
+        for recipient, versions in versions_by_recipient.items()
+    ])
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .cache import get_version_cache_key
+from .conf import VERSION_LOCKING_EVENT_BROKER
+
+
+class BaseBroker:
+    """Delivers lock events published on a channel, one channel per content
+    object, to the subscribers of the channel. Subclasses can relay the
+    events through a pub/sub service to reach the subscribers of every process.
+    """
+
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        """Called from the event loop serving the subscriber
+
+        :return: Subscription receiving the events of `channels`
+        """
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class Subscription:
+    """Queue of the events received by one subscriber, events can be put
+    from any thread and are read from the event loop the subscription was
+    created in
+    """
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+    async def get(self, timeout=None):
+        """Wait for the next event, raises asyncio.TimeoutError after `timeout` seconds
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker(BaseBroker):
+    """Broker delivering events to the subscribers of the current process
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+
+@lru_cache(maxsize=None)
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    """The broker set by VERSION_LOCKING_EVENT_BROKER, None when lock
+    events are disabled
+    """
+    if not VERSION_LOCKING_EVENT_BROKER:
+        return None
+    return _load_broker(VERSION_LOCKING_EVENT_BROKER)
+
+
+def lock_events_are_enabled():
+    return get_broker() is not None
+
+
+def get_channel(content_type_id, object_id):
+    return "{}:{}".format(content_type_id, object_id)
+
+
+def publish_lock_event(version, status):
+    """Publish the new lock status of a version on the channel of its
+    content once the current transaction commits
+
+    :param status: Lock status as returned by helpers.get_lock_status
+    """
+    broker = get_broker()
+    if broker is None:
+        return
+    channel = get_channel(*get_version_cache_key(version))
+    event = dict(status, version=version.pk, content=channel)
+    transaction.on_commit(lambda: broker.publish(channel, event))
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from functools import partial
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .conf import VERSION_LOCKING_EXPIRY_BATCH_SIZE, VERSION_LOCKING_LOCK_TTL
+from .emails import notify_lock_owners_locks_expired
+from .helpers import remove_version_locks
+from .models import VersionLock
+
+
+def get_expired_locks(ttl=None):
+    """Locks older than `ttl` seconds, oldest first
+
+    :param ttl: Lock lifetime in seconds, defaults to VERSION_LOCKING_LOCK_TTL
+    """
+    if ttl is None:
+        ttl = VERSION_LOCKING_LOCK_TTL
+    return VersionLock.objects.filter(
+        created__lt=timezone.now() - timedelta(seconds=ttl),
+    ).order_by('created', 'pk')
+
+
+def _claim_expired_locks(ttl, batch_size, using):
+    """Lock the rows of the next chunk of expired locks for the running
+    transaction, rows claimed by another sweeper are skipped where the
+    database supports it
+    """
+    queryset = get_expired_locks(ttl).using(using)
+    if connections[using].features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True)
+    else:
+        queryset = queryset.select_for_update()
+    return list(queryset.values_list('pk', flat=True)[:batch_size])
+
+
+def release_expired_locks(ttl=None, batch_size=VERSION_LOCKING_EXPIRY_BATCH_SIZE):
+    """Release one chunk of expired locks in a short transaction and notify
+    their owners once it has committed. Sweepers running in parallel on
+    several nodes claim different chunks.
+
+    :param ttl: Lock lifetime in seconds, defaults to VERSION_LOCKING_LOCK_TTL
+    :param batch_size: Maximum number of locks released
+    :return: Number of released locks
+    """
+    db = router.db_for_write(VersionLock)
+    with transaction.atomic(using=db):
+        lock_ids = _claim_expired_locks(ttl, batch_size, db)
+        if not lock_ids:
+            return 0
+        locks = list(
+            VersionLock.objects
+            .using(db)
+            .filter(pk__in=lock_ids)
+            .select_related('version', 'created_by')
+            .prefetch_related('version__content')
+        )
+        remove_version_locks([lock.version for lock in locks])
+        # Inside a transaction of the caller, the chunk is only released
+        # when the outermost transaction commits
+        transaction.on_commit(partial(notify_lock_owners_locks_expired, locks), using=db)
+    return len(locks)
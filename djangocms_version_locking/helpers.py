@@ -1,16 +1,46 @@
+import hashlib
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+
 from django.conf import settings
 from django.contrib import admin
-from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.contenttypes.models import ContentType
 from django.core.mail import EmailMessage
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Prefetch, Q, Subquery
 from django.template.loader import render_to_string
 from django.utils.encoding import force_str
 
-from djangocms_versioning import versionables
+from asgiref.local import Local
+from asgiref.sync import sync_to_async
+from djangocms_versioning import constants, versionables
 from djangocms_versioning.models import Version
 
 from .admin import VersionLockAdminMixin
+from .cache import (
+    MISSING,
+    aget_content_cache_key,
+    aget_shared_content_lock,
+    aget_shared_version_lock,
+    aset_shared_content_lock,
+    aset_shared_version_lock,
+    get_cached_lock,
+    get_content_cache_key,
+    get_shared_content_lock,
+    get_shared_version_lock,
+    get_version_cache_key,
+    invalidate_cached_lock,
+    invalidate_version_lock,
+    set_cached_lock,
+    set_shared_content_lock,
+    set_shared_version_lock,
+    shared_cache_is_enabled,
+)
 from .conf import EMAIL_NOTIFICATIONS_FAIL_SILENTLY
-from .models import VersionLock
+from .events import lock_events_are_enabled, publish_lock_event
+from .models import DraftLockOwner, VersionLock
 
 
 try:
@@ -63,25 +93,210 @@ def replace_admin_for_models(models, admin_site=None):
 
 def get_lock_for_content(content):
     """Check if a lock exists, if so return it
+
+    The result is memoised for the rest of the current request and,
+    when VERSION_LOCKING_CACHE_ALIAS is set, in the shared cache.
     """
     try:
         versionables.for_content(content)
     except KeyError:
         return None
-    try:
-        version = Version.objects.select_related('versionlock').get_for_content(content)
-        return version.versionlock
-    except ObjectDoesNotExist:
-        return None
+
+    lock = getattr(content, '_prefetched_version_lock', MISSING)
+    if lock is not MISSING:
+        return lock
+
+    cache_key = get_content_cache_key(content)
+    lock = get_cached_lock(cache_key)
+    if lock is not MISSING:
+        return lock
+
+    lock = get_shared_content_lock(cache_key)
+    if lock is not MISSING:
+        set_cached_lock(cache_key, lock)
+        return lock
+
+    content_type_id, object_id = cache_key
+    lock = (
+        VersionLock.objects
+        .select_related('created_by')
+        .filter(content_type_id=content_type_id, object_id=object_id)
+        .first()
+    )
+    set_shared_content_lock(cache_key, lock)
+    set_cached_lock(cache_key, lock)
+    return lock
+
+
+def get_locks_for_contents(contents):
+    """Resolve the locks of many content objects at once.
+
+    Content objects are grouped by content type and the locks of every
+    group are fetched with a single query.
+
+    :param contents: Iterable of content objects, objects of models that
+        aren't versioned are allowed and are never locked
+    :return: A dict mapping each content object to its lock or None
+    """
+    locks = {}
+    cache_keys = {}
+    object_ids_by_content_type = defaultdict(set)
+    for content in contents:
+        locks[content] = None
+        try:
+            versionables.for_content(content)
+        except KeyError:
+            continue
+        content_type_id, object_id = cache_keys[content] = get_content_cache_key(content)
+        object_ids_by_content_type[content_type_id].add(object_id)
+
+    found = {}
+    for content_type_id, object_ids in object_ids_by_content_type.items():
+        queryset = VersionLock.objects.select_related('created_by').filter(
+            content_type_id=content_type_id,
+            object_id__in=object_ids,
+        )
+        for lock in queryset:
+            found[lock.content_type_id, lock.object_id] = lock
+
+    for content, cache_key in cache_keys.items():
+        locks[content] = found.get(cache_key)
+        set_cached_lock(cache_key, locks[content])
+    return locks
+
+
+def prefetch_locks(contents):
+    """Attach the lock of every content object to the object itself, the
+    way prefetch_related would, so that get_lock_for_content and the
+    helpers built on it don't query the database again.
+
+    :param contents: Iterable of content objects
+    :return: The content objects as a list
+    """
+    contents = list(contents)
+    locks = get_locks_for_contents(contents)
+    for content in contents:
+        content._prefetched_version_lock = locks[content]
+    return contents
+
+
+def prefetch_versions_with_locks(queryset):
+    """Prefetch the versions of a content queryset together with their
+    locks and lock owners, so that `obj.versions.all()` and
+    `version_is_locked` are answered from the prefetch cache.
+
+    :param queryset: QuerySet of a versioned content model
+    """
+    return queryset.prefetch_related(
+        Prefetch(
+            'versions',
+            queryset=Version.objects.select_related('versionlock', 'versionlock__created_by'),
+        )
+    )
+
+
+def prefetch_version_locks(versions):
+    """Resolve the locks of many versions with a single query and cache
+    them on the versions, the way select_related would, so that
+    `version_is_locked` doesn't query the database again.
+
+    :param versions: Iterable of versions, versions with a cached lock
+        are skipped
+    """
+    versions = [version for version in versions if not Version.versionlock.is_cached(version)]
+    if not versions:
+        return
+    locks = {
+        lock.version_id: lock
+        for lock in VersionLock.objects.select_related('created_by').filter(version__in=versions)
+    }
+    for version in versions:
+        Version.versionlock.related.set_cached_value(version, locks.get(version.pk))
+
+
+def annotate_draft_version_user_id(queryset, versionable):
+    """Annotate every version with `_draft_version_user_id`, the id of the
+    user holding the lock of the latest draft in the same grouping, as
+    read by the draft lock checks of `check_revert`, `check_unpublish`
+    and `check_edit_redirect`.
+
+    :param queryset: QuerySet of versions of `versionable`
+    :param versionable: VersionableItem of the versions
+    """
+    content_manager = versionable.content_model._base_manager
+    grouping_aliases = {
+        '_draft_grouping_{}'.format(field): Subquery(
+            content_manager.filter(pk=OuterRef('object_id')).values(field)[:1]
+        )
+        for field in versionable.grouping_fields
+    }
+    draft_contents = content_manager.filter(**{
+        field: OuterRef(OuterRef(alias))
+        for field, alias in zip(versionable.grouping_fields, grouping_aliases)
+    })
+    draft_locks = VersionLock.objects.filter(
+        version__content_type=OuterRef('content_type'),
+        version__object_id__in=draft_contents.values('pk'),
+        version__state=constants.DRAFT,
+    ).order_by('version__pk')
+    return queryset.alias(**grouping_aliases).annotate(
+        _draft_version_user_id=Subquery(draft_locks.values('created_by_id')[:1])
+    )
+
+
+def get_lock_status(lock):
+    """Compact, JSON serialisable description of a lock
+    """
+    if lock is None:
+        return {'locked': False}
+    return {
+        'locked': True,
+        'owner': {
+            'id': lock.created_by_id,
+            'name': lock.created_by.get_full_name() or lock.created_by.get_username(),
+        },
+        'since': lock.created.isoformat(),
+    }
+
+
+def get_lock_statuses(content_type_id, version_ids=(), content_ids=()):
+    """Describe the locks of many versions and content objects of a content
+    type with a single query, versions of other content types are reported
+    as unlocked
+
+    :param content_type_id: Content type of the versions and content objects
+    :param version_ids: Ids of versions
+    :param content_ids: Ids of content objects
+    :return: Tuple of two dicts mapping each of the version ids and content
+        ids to the status of its lock
+    """
+    locks = VersionLock.objects.filter(
+        Q(version_id__in=version_ids) | Q(object_id__in=content_ids),
+        content_type_id=content_type_id,
+    ).select_related('created_by')
+
+    locks_by_version = {}
+    locks_by_content = {}
+    for lock in locks:
+        locks_by_version[lock.version_id] = lock
+        locks_by_content[lock.object_id] = lock
+    return (
+        {pk: get_lock_status(locks_by_version.get(pk)) for pk in version_ids},
+        {pk: get_lock_status(locks_by_content.get(pk)) for pk in content_ids},
+    )
+
+
+def lock_is_unlocked_for_user(lock, user):
+    """Check if lock doesn't exist or is held by provided user.
+    """
+    return lock is None or lock.created_by_id == user.pk
 
 
 def content_is_unlocked_for_user(content, user):
     """Check if lock doesn't exist or object is locked to provided user.
     """
     lock = get_lock_for_content(content)
-    if lock is None:
-        return True
-    return lock.created_by == user
+    return lock_is_unlocked_for_user(lock, user)
 
 
 def placeholder_content_is_unlocked_for_user(placeholder, user):
@@ -92,16 +307,70 @@ def placeholder_content_is_unlocked_for_user(placeholder, user):
     return content_is_unlocked_for_user(content, user)
 
 
+class _ContentChanges:
+    """Content changes queued on a connection, emitted once per content
+    object when the transaction they were made in commits
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.emitted = set()
+
+    def emit(self, key, version):
+        # The transaction has committed, the next one queues its own changes
+        if getattr(self.connection, '_version_locking_content_changes', None) is self:
+            self.connection._version_locking_content_changes = None
+        if key not in self.emitted:
+            self.emitted.add(key)
+            emit_content_change(version.content)
+
+
+def emit_content_change_on_commit(version):
+    """Emit the change of the content of a version once the current
+    transaction commits. The content of every version is emitted once per
+    transaction and nothing is emitted when the transaction is rolled back.
+    """
+    if not emit_content_change:
+        return
+    connection = transaction.get_connection()
+    changes = getattr(connection, '_version_locking_content_changes', None)
+    if changes is None:
+        changes = connection._version_locking_content_changes = _ContentChanges(connection)
+    # The callbacks of rolled back transactions and savepoints are discarded,
+    # the changes of the committed ones are deduplicated as they run. Runs
+    # straight away outside of a transaction.
+    transaction.on_commit(partial(changes.emit, get_version_cache_key(version), version))
+
+
 def create_version_lock(version, user):
     """
-    Create a version lock if necessary
+    Create a version lock if necessary, the existing lock is returned
+    when the version is already locked
     """
-    lock, created = VersionLock.objects.get_or_create(
-        version=version,
-        created_by=user
-    )
-    if created and emit_content_change:
-        emit_content_change(version.content)
+    # Insert first and only look the lock up on conflict, this can't race
+    # with another save. Inside a transaction the insert is wrapped in a
+    # savepoint to recover from the conflict, otherwise it's a single statement.
+    lock = VersionLock(version=version, created_by=user)
+    try:
+        if transaction.get_connection().in_atomic_block:
+            with transaction.atomic():
+                lock.save(force_insert=True)
+        else:
+            lock.save(force_insert=True)
+    except IntegrityError:
+        existing_lock = VersionLock.objects.select_related('created_by').filter(version=version).first()
+        # Not a conflict with an existing lock, such as a missing user
+        if existing_lock is None:
+            raise
+        lock = existing_lock
+        created = False
+    else:
+        created = True
+    invalidate_version_lock(version)
+    Version.versionlock.related.set_cached_value(version, lock)
+    if created:
+        emit_content_change_on_commit(version)
+        publish_lock_event(version, get_lock_status(lock))
     return lock
 
 
@@ -110,8 +379,28 @@ def remove_version_lock(version):
     Delete a version lock, handles when there are none available.
     """
     deleted = VersionLock.objects.filter(version=version).delete()
-    if deleted[0] and emit_content_change:
-        emit_content_change(version.content)
+    invalidate_version_lock(version)
+    Version.versionlock.related.set_cached_value(version, None)
+    if deleted[0]:
+        emit_content_change_on_commit(version)
+        publish_lock_event(version, get_lock_status(None))
+    return deleted
+
+
+def remove_version_locks(versions):
+    """
+    Delete the locks of many versions with a single query, handles when
+    there are none available.
+    """
+    versions = list(versions)
+    deleted = VersionLock.objects.filter(version__in=versions).delete()
+    for version in versions:
+        invalidate_version_lock(version)
+        Version.versionlock.related.set_cached_value(version, None)
+    if deleted[0]:
+        for version in versions:
+            emit_content_change_on_commit(version)
+            publish_lock_event(version, get_lock_status(None))
     return deleted
 
 
@@ -119,35 +408,169 @@ def version_is_locked(version):
     """
     Determine if a version is locked
     """
-    return getattr(version, "versionlock", None)
+    if version is None or version.pk is None or Version.versionlock.is_cached(version):
+        return getattr(version, "versionlock", None)
+
+    lock = get_shared_version_lock(version.pk)
+    if lock is not MISSING:
+        Version.versionlock.related.set_cached_value(version, lock)
+        return lock
+
+    lock = getattr(version, "versionlock", None)
+    set_shared_version_lock(version.pk, lock)
+    return lock
 
 
 def version_is_unlocked_for_user(version, user):
     """Check if lock doesn't exist for a version object or is locked to provided user.
     """
     lock = version_is_locked(version)
-    return lock is None or lock.created_by == user
+    return lock_is_unlocked_for_user(lock, user)
 
 
-def send_email(
+async def aget_lock_for_content(content):
+    """Async counterpart of get_lock_for_content
+    """
+    try:
+        versionables.for_content(content)
+    except KeyError:
+        return None
+
+    lock = getattr(content, '_prefetched_version_lock', MISSING)
+    if lock is not MISSING:
+        return lock
+
+    cache_key = await aget_content_cache_key(content)
+    lock = get_cached_lock(cache_key)
+    if lock is not MISSING:
+        return lock
+
+    lock = await aget_shared_content_lock(cache_key)
+    if lock is not MISSING:
+        set_cached_lock(cache_key, lock)
+        return lock
+
+    content_type_id, object_id = cache_key
+    lock = await (
+        VersionLock.objects
+        .select_related('created_by')
+        .filter(content_type_id=content_type_id, object_id=object_id)
+        .afirst()
+    )
+    await aset_shared_content_lock(cache_key, lock)
+    set_cached_lock(cache_key, lock)
+    return lock
+
+
+async def acontent_is_unlocked_for_user(content, user):
+    """Async counterpart of content_is_unlocked_for_user
+    """
+    lock = await aget_lock_for_content(content)
+    return lock_is_unlocked_for_user(lock, user)
+
+
+async def aversion_is_locked(version):
+    """Async counterpart of version_is_locked
+    """
+    if version is None or version.pk is None:
+        return None
+    if Version.versionlock.is_cached(version):
+        return getattr(version, "versionlock", None)
+
+    lock = await aget_shared_version_lock(version.pk)
+    if lock is MISSING:
+        lock = await VersionLock.objects.select_related('created_by').filter(version=version).afirst()
+        await aset_shared_version_lock(version.pk, lock)
+    Version.versionlock.related.set_cached_value(version, lock)
+    return lock
+
+
+async def aversion_is_unlocked_for_user(version, user):
+    """Async counterpart of version_is_unlocked_for_user
+    """
+    lock = await aversion_is_locked(version)
+    return lock_is_unlocked_for_user(lock, user)
+
+
+def _lock_changed(version, lock, changed):
+    invalidate_version_lock(version)
+    if changed:
+        emit_content_change_on_commit(version)
+        publish_lock_event(version, get_lock_status(lock))
+
+
+# Invalidating the shared cache, emitting the content change and publishing
+# the event register transaction.on_commit callbacks, which can't be done
+# from the event loop
+_sync_lock_changed = sync_to_async(_lock_changed)
+
+
+async def _alock_changed(version, lock, changed):
+    if shared_cache_is_enabled() or (changed and (emit_content_change or lock_events_are_enabled())):
+        await _sync_lock_changed(version, lock, changed)
+    else:
+        # Only the request cache is left to invalidate, it lives on the event loop
+        invalidate_cached_lock(get_version_cache_key(version))
+
+
+async def acreate_version_lock(version, user):
+    """Async counterpart of create_version_lock, the existing lock is
+    returned when the version is already locked
+    """
+    lock, created = await VersionLock.objects.select_related('created_by').aget_or_create(
+        version=version,
+        defaults={'created_by': user},
+    )
+    Version.versionlock.related.set_cached_value(version, lock)
+    await _alock_changed(version, lock, created)
+    return lock
+
+
+async def aremove_version_lock(version):
+    """Async counterpart of remove_version_lock
+    """
+    deleted = await VersionLock.objects.filter(version=version).adelete()
+    Version.versionlock.related.set_cached_value(version, None)
+    await _alock_changed(version, None, bool(deleted[0]))
+    return deleted
+
+
+def get_email_message(
     recipients,
     subject,
     template,
     template_context
 ):
     """
-    Send emails using locking templates
+    Build an email using locking templates
     """
     template = 'djangocms_version_locking/emails/{}'.format(template)
     subject = force_str(subject)
     content = render_to_string(template, template_context)
 
-    message = EmailMessage(
+    return EmailMessage(
         subject=subject,
         body=content,
         from_email=settings.DEFAULT_FROM_EMAIL,
         to=recipients,
     )
+
+
+def send_email(
+    recipients,
+    subject,
+    template,
+    template_context
+):
+    """
+    Send emails using locking templates
+    """
+    message = get_email_message(
+        recipients=recipients,
+        subject=subject,
+        template=template,
+        template_context=template_context,
+    )
     return message.send(
         fail_silently=EMAIL_NOTIFICATIONS_FAIL_SILENTLY
     )
@@ -166,3 +589,116 @@ def get_latest_draft_version(version):
     )
 
     return drafts.first()
+
+
+def get_grouping_key(content):
+    """Key of the draft lock owner of the grouping `content` belongs to, a
+    hash of its content type and grouping values
+    """
+    versionable = versionables.for_content(content)
+    grouping = [
+        ContentType.objects.get_for_model(content).pk,
+        sorted(versionable.grouping_values(content, relation_suffix=True).items()),
+    ]
+    return hashlib.sha256(json.dumps(grouping, default=str).encode()).hexdigest()
+
+
+def get_draft_lock_owner(version):
+    """Return the user holding the lock of the draft in the grouping of
+    `version`, or None when there is no draft or it isn't locked
+
+    The draft is read from the DraftLockOwner table together with its lock.
+    Groupings that haven't been recorded yet, by saving a draft or with
+    reconcile_version_locks --repair, are looked up on the version table.
+    Nothing is written.
+    """
+    key = get_grouping_key(version.content)
+    draft_lock_owner = (
+        DraftLockOwner.objects
+        .select_related('version__versionlock__created_by')
+        .filter(pk=key)
+        .first()
+    )
+    # The owner is read from the lock itself and can't be stale, only a
+    # draft whose state was changed bypassing Version.save can be
+    if draft_lock_owner is not None and (
+        draft_lock_owner.version is None or draft_lock_owner.version.state == constants.DRAFT
+    ):
+        draft_version = draft_lock_owner.version
+    else:
+        draft_version = get_latest_draft_version(version)
+    lock = version_is_locked(draft_version)
+    return lock.created_by if lock else None
+
+
+def set_draft_version(version):
+    """Record `version` as the draft of its grouping
+    """
+    key = get_grouping_key(version.content)
+    # Only new groupings are inserted, update first to take a single statement
+    if DraftLockOwner.objects.filter(pk=key).update(version=version):
+        return
+    # Like create_version_lock, a savepoint is only needed to recover from
+    # a conflict inside a transaction
+    draft = DraftLockOwner(key=key, version=version)
+    try:
+        if transaction.get_connection().in_atomic_block:
+            with transaction.atomic():
+                draft.save(force_insert=True)
+        else:
+            draft.save(force_insert=True)
+    except IntegrityError:
+        DraftLockOwner.objects.filter(pk=key).update(version=version)
+
+
+def clear_draft_version(version):
+    """Record that the grouping of `version` has no draft anymore, once
+    `version` has left the draft state
+    """
+    DraftLockOwner.objects.filter(version=version).update(version=None)
+
+
+def clear_draft_versions(versions):
+    """Record that the groupings of many versions have no draft anymore
+    with a single query
+    """
+    DraftLockOwner.objects.filter(version__in=versions).update(version=None)
+
+
+_lock_removals = Local()
+
+
+@contextmanager
+def batch_draft_lock_removals():
+    """Run the block in a transaction and remove the locks of all the drafts
+    it moves to another state with a single query, before the transaction
+    commits. Nested blocks are removed by the outermost one.
+
+    Use it around code transitioning many versions at once, such as
+    publishing a moderation collection.
+    """
+    if getattr(_lock_removals, 'versions', None) is not None:
+        yield
+        return
+    versions = _lock_removals.versions = []
+    try:
+        with transaction.atomic():
+            yield
+            _lock_removals.versions = None
+            if versions:
+                remove_version_locks(versions)
+                clear_draft_versions(versions)
+    finally:
+        _lock_removals.versions = None
+
+
+def remove_draft_version_lock(version):
+    """Remove the lock of a version that has left the draft state, or queue
+    its removal inside batch_draft_lock_removals
+    """
+    versions = getattr(_lock_removals, 'versions', None)
+    if versions is not None:
+        versions.append(version)
+        return
+    remove_version_lock(version)
+    clear_draft_version(version)
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from djangocms_version_locking.reconcile import (
+    reconcile_inactive_user_locks,
+    reconcile_stray_draft_records,
+    reconcile_stray_locks,
+    reconcile_unlocked_drafts,
+    reconcile_unrecorded_drafts,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Report drafts without a lock, locks of versions that aren't drafts, "
+        "locks held by deactivated users and drafts that aren't recorded for "
+        "their grouping, and optionally repair them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rows read and repaired at once",
+        )
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Lock the unlocked drafts, remove the locks that shouldn't exist and record the drafts",
+        )
+        parser.add_argument(
+            "--reassign-to",
+            help="Username of the user taking over the locks of deactivated users, "
+                 "the locks are released when not given",
+        )
+
+    def handle(self, *args, **options):
+        reassign_to = None
+        if options["reassign_to"]:
+            User = get_user_model()
+            try:
+                reassign_to = User.objects.get(**{User.USERNAME_FIELD: options["reassign_to"]}, is_active=True)
+            except User.DoesNotExist:
+                raise CommandError("No active user {}".format(options["reassign_to"]))
+
+        chunk_size = options["chunk_size"]
+        repair = options["repair"]
+        results = [
+            ("Drafts without a lock", reconcile_unlocked_drafts(chunk_size, repair=repair)),
+            ("Locks of versions that aren't drafts", reconcile_stray_locks(chunk_size, repair=repair)),
+            (
+                "Locks held by deactivated users",
+                reconcile_inactive_user_locks(chunk_size, repair=repair, reassign_to=reassign_to),
+            ),
+            ("Drafts not recorded for their grouping", reconcile_unrecorded_drafts(chunk_size, repair=repair)),
+            ("Records of versions that aren't drafts", reconcile_stray_draft_records(chunk_size, repair=repair)),
+        ]
+        for description, found in results:
+            self.stdout.write("{}: {}{}".format(description, found, " (repaired)" if repair and found else ""))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djangocms_version_locking.conf import (
+    VERSION_LOCKING_EXPIRY_BATCH_SIZE,
+    VERSION_LOCKING_LOCK_TTL,
+)
+from djangocms_version_locking.expiry import release_expired_locks
+
+
+class Command(BaseCommand):
+    help = "Release the version locks older than the lock TTL and notify their owners"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ttl",
+            type=int,
+            default=VERSION_LOCKING_LOCK_TTL,
+            help="Seconds after which a lock expires, defaults to VERSION_LOCKING_LOCK_TTL",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=VERSION_LOCKING_EXPIRY_BATCH_SIZE,
+            help="Number of locks released in one transaction",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and poll for newly expired locks",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60,
+            help="Seconds to wait between polls when no lock has expired",
+        )
+
+    def handle(self, *args, **options):
+        if options["ttl"] is None:
+            raise CommandError("Set VERSION_LOCKING_LOCK_TTL or pass --ttl to release expired locks")
+
+        total_released = 0
+        while True:
+            released = release_expired_locks(ttl=options["ttl"], batch_size=options["batch_size"])
+            total_released += released
+            # Release the expired locks chunk by chunk until none is left
+            if released:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write("Released {} expired lock(s)".format(total_released))
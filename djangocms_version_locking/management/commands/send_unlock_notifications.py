@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from djangocms_version_locking.conf import EMAIL_NOTIFICATIONS_BATCH_SIZE
+from djangocms_version_locking.outbox import (
+    CircuitBreaker,
+    dispatch_notifications,
+)
+
+
+class Command(BaseCommand):
+    help = "Send the unlock notifications queued in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=EMAIL_NOTIFICATIONS_BATCH_SIZE,
+            help="Number of notifications sent over one mail connection",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and poll the outbox for new notifications",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between polls when the outbox is empty",
+        )
+
+    def handle(self, *args, **options):
+        circuit_breaker = CircuitBreaker()
+        total_delivered = total_failed = 0
+        while True:
+            delivered, failed = dispatch_notifications(
+                batch_size=options["batch_size"],
+                circuit_breaker=circuit_breaker,
+            )
+            total_delivered += delivered
+            total_failed += failed
+            # Drain the outbox batch by batch until it's empty or the
+            # mail server is failing
+            if delivered and not circuit_breaker.is_open:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            "Sent {} notification(s), {} failed".format(total_delivered, total_failed)
+        )
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_version_locking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnlockNotification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('recipient', models.EmailField(max_length=254, verbose_name='recipient')),
+                ('site_name', models.CharField(max_length=255, verbose_name='site name')),
+                ('title', models.TextField(verbose_name='title')),
+                ('version_link', models.TextField(verbose_name='version link')),
+                ('unlocked_by', models.CharField(max_length=255, verbose_name='unlocked by')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='attempts')),
+                ('next_attempt', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='next attempt')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+            ],
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_version_locking', '0002_unlocknotification'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='versionlock',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
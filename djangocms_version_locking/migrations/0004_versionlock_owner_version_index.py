@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_version_locking', '0003_versionlock_created_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='versionlock',
+            index=models.Index(fields=['created_by', 'version'], name='versionlock_owner_version_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('djangocms_version_locking', '0004_versionlock_owner_version_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='versionlock',
+            name='content_type',
+            field=models.ForeignKey(
+                db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE,
+                related_name='+', to='contenttypes.contenttype', verbose_name='content type',
+            ),
+        ),
+        migrations.AddField(
+            model_name='versionlock',
+            name='object_id',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='object id'),
+        ),
+        migrations.AddIndex(
+            model_name='versionlock',
+            index=models.Index(fields=['content_type', 'object_id'], name='versionlock_content_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Subquery
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_lock_content(apps, schema_editor):
+    """Copy the content of the version onto every lock, a batch at a time
+    and each batch in its own transaction so that rows are only locked
+    briefly. Only locks without a content are updated, an interrupted run
+    resumes where it stopped.
+    """
+    VersionLock = apps.get_model('djangocms_version_locking', 'VersionLock')
+    Version = apps.get_model('djangocms_versioning', 'Version')
+    db_alias = schema_editor.connection.alias
+    versions = Version.objects.using(db_alias).filter(pk=OuterRef('version_id'))
+    pending = VersionLock.objects.using(db_alias).filter(content_type__isnull=True)
+
+    last_pk = 0
+    while True:
+        batch = list(pending.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not batch:
+            return
+        with transaction.atomic(using=db_alias):
+            VersionLock.objects.using(db_alias).filter(pk__in=batch).update(
+                content_type_id=Subquery(versions.values('content_type_id')[:1]),
+                object_id=Subquery(versions.values('object_id')[:1]),
+            )
+        last_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('djangocms_version_locking', '0005_versionlock_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lock_content, migrations.RunPython.noop, elidable=True),
+    ]
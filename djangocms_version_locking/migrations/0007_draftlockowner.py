@@ -0,0 +1,23 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_versioning', '0010_version_proxies'),
+        ('djangocms_version_locking', '0006_backfill_versionlock_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DraftLockOwner',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('version', models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+',
+                    to='djangocms_versioning.version', verbose_name='draft version',
+                )),
+            ],
+        ),
+    ]
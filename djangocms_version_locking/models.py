@@ -1,12 +1,14 @@
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from djangocms_versioning.models import Version
 
 
 class VersionLock(models.Model):
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.PROTECT,
@@ -17,3 +19,65 @@ class VersionLock(models.Model):
         on_delete=models.CASCADE,
         verbose_name=_('version')
     )
+    # Copy of the content of the version, so that the lock of a content
+    # object is found without joining the versions
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        db_index=False,
+        related_name='+',
+        verbose_name=_('content type')
+    )
+    object_id = models.PositiveIntegerField(
+        null=True,
+        editable=False,
+        verbose_name=_('object id')
+    )
+
+    class Meta:
+        indexes = [
+            # Serves the "locked by" filters without reading the versions
+            models.Index(fields=['created_by', 'version'], name='versionlock_owner_version_idx'),
+            # Serves the lock lookups of content objects
+            models.Index(fields=['content_type', 'object_id'], name='versionlock_content_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The content of a version never changes, it only has to be copied once
+        if self.content_type_id is None:
+            self.content_type_id = self.version.content_type_id
+            self.object_id = self.version.object_id
+        super().save(*args, **kwargs)
+
+
+class DraftLockOwner(models.Model):
+    """The draft of a grouping of versions, kept up to date when drafts are
+    saved so that the draft lock checks of revert, unpublish and edit
+    redirect read the draft and its lock with a primary key lookup
+    """
+    # Hash of the content type and the grouping values
+    key = models.CharField(max_length=64, primary_key=True)
+    version = models.ForeignKey(
+        Version,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+        verbose_name=_('draft version')
+    )
+
+
+class UnlockNotification(models.Model):
+    """An unlock notification waiting in the outbox to be emailed to the
+    author of the unlocked version
+    """
+    created = models.DateTimeField(auto_now_add=True)
+    recipient = models.EmailField(verbose_name=_('recipient'))
+    site_name = models.CharField(max_length=255, verbose_name=_('site name'))
+    title = models.TextField(verbose_name=_('title'))
+    version_link = models.TextField(verbose_name=_('version link'))
+    unlocked_by = models.CharField(max_length=255, verbose_name=_('unlocked by'))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_('attempts'))
+    next_attempt = models.DateTimeField(default=timezone.now, db_index=True, verbose_name=_('next attempt'))
+    last_error = models.TextField(blank=True, verbose_name=_('last error'))
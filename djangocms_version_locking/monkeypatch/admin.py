@@ -1,22 +1,46 @@
+import hashlib
+import json
+from functools import lru_cache
+
 from django.contrib import messages
+from django.contrib.admin import SimpleListFilter
 from django.contrib.admin.utils import unquote
-from django.http import Http404, HttpResponseForbidden, HttpResponseNotAllowed
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    HttpResponseNotAllowed,
+    JsonResponse,
+)
 from django.shortcuts import redirect
-from django.template.loader import render_to_string
-from django.urls import re_path, reverse
+from django.urls import re_path
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.encoding import force_str
-from django.utils.translation import gettext_lazy as _
+from django.utils.translation import gettext_lazy as _, ngettext
 
-from djangocms_versioning import admin, constants
+from djangocms_versioning import admin, constants, versionables
 from djangocms_versioning.helpers import version_list_url
 
 from djangocms_version_locking.emails import (
-    notify_version_author_version_unlocked,
+    unlock_version_and_notify_author,
+    unlock_versions_and_notify_authors,
 )
 from djangocms_version_locking.helpers import (
-    remove_version_lock,
+    annotate_draft_version_user_id,
+    create_version_lock,
+    get_lock_statuses,
+    prefetch_versions_with_locks,
     version_is_locked,
 )
+from djangocms_version_locking.models import VersionLock
+from djangocms_version_locking.utils import (
+    get_cached_admin_url,
+    render_cached_fragment,
+    render_unlock_icon,
+)
 
 
 def locked(self, version):
@@ -24,11 +48,13 @@ def locked(self, version):
     Generate an locked field for Versioning Admin
     """
     if version.state == constants.DRAFT and version_is_locked(version):
-        return render_to_string('djangocms_version_locking/admin/locked_icon.html')
+        return render_cached_fragment('djangocms_version_locking/admin/locked_icon.html')
     return ""
 
 
 locked.short_description = _('locked')
+# Ordered on the lock joined by the queryset, unlocked versions come first
+locked.admin_order_field = F('versionlock').asc(nulls_first=True)
 admin.VersionAdmin.locked = locked
 
 
@@ -46,6 +72,121 @@ def get_list_display(func):
 admin.VersionAdmin.get_list_display = get_list_display(admin.VersionAdmin.get_list_display)
 
 
+def get_queryset(func):
+    """
+    Join the version lock and its owner so that rendering the lock state
+    of each row doesn't issue its own query
+    """
+    def inner(self, request):
+        queryset = func(self, request)
+        return queryset.select_related('versionlock', 'versionlock__created_by')
+    return inner
+
+
+admin.VersionAdmin.get_queryset = get_queryset(admin.VersionAdmin.get_queryset)
+
+
+@lru_cache(maxsize=None)
+def _draft_lock_change_list_factory(change_list_class):
+    class DraftLockChangeList(change_list_class):
+        def get_queryset(self, request, *args, **kwargs):
+            queryset = super().get_queryset(request, *args, **kwargs)
+            source_model = getattr(self.model_admin.model, '_source_model', None)
+            if source_model is None:
+                return queryset
+            return annotate_draft_version_user_id(queryset, versionables.for_content(source_model))
+    return DraftLockChangeList
+
+
+def get_changelist(func):
+    """
+    Annotate the changelist rows with the owner of the draft lock read by
+    their revert, unpublish and edit checks. The views acting on a single
+    version look the lock up, so that their error names its owner.
+    """
+    def inner(self, request, **kwargs):
+        return _draft_lock_change_list_factory(func(self, request, **kwargs))
+    return inner
+
+
+admin.VersionAdmin.get_changelist = get_changelist(admin.VersionAdmin.get_changelist)
+
+
+class VersionLockFilter(SimpleListFilter):
+    """
+    Filter the versions by the state of their lock
+    """
+    title = _('lock')
+    parameter_name = 'locked'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('yes', _('Locked')),
+            ('mine', _('Locked by me')),
+            ('no', _('Unlocked')),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.locked()
+        if self.value() == 'mine':
+            return queryset.locked_by(request.user)
+        if self.value() == 'no':
+            return queryset.unlocked()
+        return queryset
+
+
+class VersionLockOwnerFilter(SimpleListFilter):
+    """
+    Filter the versions by the user holding their lock
+    """
+    title = _('locked by')
+    parameter_name = 'locked_by'
+
+    def lookups(self, request, model_admin):
+        # Only the other users holding a lock on versions of this content
+        # type, the locks of the current user are listed by "Locked by me"
+        owner_ids = VersionLock.objects.filter(
+            version__content_type=ContentType.objects.get_for_model(model_admin.model._source_model),
+        ).values('created_by')
+        return [
+            (str(user.pk), user.get_full_name() or user.get_username())
+            for user in get_user_model().objects.filter(pk__in=owner_ids).exclude(pk=request.user.pk)
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.locked_by(self.value())
+        return queryset
+
+
+def get_list_filter(func):
+    """
+    Register the lock filters with the Versioning Admin
+    """
+    def inner(self, request):
+        return list(func(self, request)) + [VersionLockFilter, VersionLockOwnerFilter]
+    return inner
+
+
+admin.VersionAdmin.get_list_filter = get_list_filter(admin.VersionAdmin.get_list_filter)
+
+
+def get_extended_queryset(func):
+    """
+    Prefetch the versions and their locks for content admins using the
+    extended versioning admin, so that the field modifiers registered through
+    `extended_admin_field_modifiers` don't query per row
+    """
+    def inner(self, request):
+        queryset = func(self, request)
+        return prefetch_versions_with_locks(queryset)
+    return inner
+
+
+admin.ExtendedVersionAdminMixin.get_queryset = get_extended_queryset(admin.ExtendedVersionAdminMixin.get_queryset)
+
+
 def _unlock_view(self, request, object_id):
     """
     Unlock a locked version
@@ -68,14 +209,12 @@ def _unlock_view(self, request, object_id):
     if not request.user.has_perm('djangocms_version_locking.delete_versionlock'):
         return HttpResponseForbidden(force_str(_("You do not have permission to remove the version lock")))
 
-    # Unlock the version
-    remove_version_lock(version)
+    # Unlock the version and notify its author
+    unlock_version_and_notify_author(version, request.user)
+
     # Display message
     messages.success(request, _("Version unlocked"))
 
-    # Send an email notification
-    notify_version_author_version_unlocked(version, request.user)
-
     # Redirect
     url = version_list_url(version.content)
     return redirect(url)
@@ -84,6 +223,86 @@ def _unlock_view(self, request, object_id):
 admin.VersionAdmin._unlock_view = _unlock_view
 
 
+def _parse_ids(value):
+    return [int(pk) for pk in value.split(',') if pk] if value else []
+
+
+def _lock_status_view(self, request):
+    """
+    Report the lock status of the versions and content objects listed in the
+    `version` and `content` GET parameters as comma separated ids, clients
+    polling it get a 304 response while none of the locks changed
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    if not self.has_view_or_change_permission(request):
+        return HttpResponseForbidden(force_str(_("You do not have permission to view the version locks")))
+
+    try:
+        version_ids = _parse_ids(request.GET.get('version'))
+        content_ids = _parse_ids(request.GET.get('content'))
+    except ValueError:
+        return HttpResponseBadRequest(force_str(_("Versions and contents must be comma separated ids")))
+
+    # Only the locks of this admin's versions are reported
+    content_type_id = ContentType.objects.get_for_model(self.model._source_model).pk
+    versions, contents = get_lock_statuses(content_type_id, version_ids, content_ids)
+    data = {'versions': versions, 'contents': contents}
+
+    # The statuses only depend on the lock rows, hashing them gives an ETag
+    # that changes whenever one of the locks is created, removed or reassigned
+    etag = '"{}"'.format(hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(data)
+        response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+admin.VersionAdmin._lock_status_view = _lock_status_view
+
+
+def has_unlock_permission(self, request):
+    """
+    Check whether the user can remove version locks
+    """
+    return request.user.has_perm('djangocms_version_locking.delete_versionlock')
+
+
+admin.VersionAdmin.has_unlock_permission = has_unlock_permission
+
+
+def unlock_versions(self, request, queryset):
+    """
+    Admin action unlocking all the selected draft versions at once
+    """
+    versions = [
+        version for version in (
+            queryset
+            .filter(state=constants.DRAFT)
+            .select_related('versionlock', 'created_by')
+            .prefetch_related('content')
+        )
+        if version_is_locked(version)
+    ]
+
+    unlock_versions_and_notify_authors(versions, request.user)
+
+    messages.success(request, ngettext(
+        "%(count)d version unlocked",
+        "%(count)d versions unlocked",
+        len(versions),
+    ) % {'count': len(versions)})
+
+
+unlock_versions.short_description = _("Unlock selected versions")
+unlock_versions.allowed_permissions = ('unlock', )
+admin.VersionAdmin.unlock_versions = unlock_versions
+admin.VersionAdmin.actions = list(admin.VersionAdmin.actions or []) + ['unlock_versions']
+
+
 def _get_unlock_link(self, obj, request):
     """
     Generate an unlock link for the Versioning Admin
@@ -95,20 +314,14 @@ def _get_unlock_link(self, obj, request):
     disabled = True
     # Check whether the lock can be removed
     # Check that the user has unlock permission
-    if version_is_locked(obj) and request.user.has_perm('djangocms_version_locking.delete_versionlock'):
+    if request.user.has_perm('djangocms_version_locking.delete_versionlock'):
         disabled = False
 
-    unlock_url = reverse('admin:{app}_{model}_unlock'.format(
+    unlock_url = get_cached_admin_url('admin:{app}_{model}_unlock'.format(
         app=obj._meta.app_label, model=self.model._meta.model_name,
-    ), args=(obj.pk,))
+    ), obj.pk)
 
-    return render_to_string(
-        'djangocms_version_locking/admin/unlock_icon.html',
-        {
-            'unlock_url': unlock_url,
-            'disabled': disabled
-        }
-    )
+    return render_unlock_icon(unlock_url, disabled)
 
 
 admin.VersionAdmin._get_unlock_link = _get_unlock_link
@@ -121,6 +334,11 @@ def _get_urls(func):
     def inner(self, *args, **kwargs):
         url_list = func(self, *args, **kwargs)
         info = self.model._meta.app_label, self.model._meta.model_name
+        url_list.insert(0, re_path(
+            r'^lock-status/$',
+            self.admin_site.admin_view(self._lock_status_view),
+            name='{}_{}_lock_status'.format(*info),
+        ))
         url_list.insert(0, re_path(
             r'^(.+)/unlock/$',
             self.admin_site.admin_view(self._unlock_view),
@@ -158,6 +376,9 @@ def _get_edit_redirect_version(func):
             # Saving the version will Add a lock to the current user editing now it's in an unlocked state
             version.created_by = request.user
             version.save()
+            # The save doesn't look the lock up when the author is unchanged
+            if not version_is_locked(version):
+                create_version_lock(version, request.user)
         return version
     return inner
 
@@ -6,8 +6,8 @@ from cms.toolbar.items import Button, ButtonList
 from djangocms_versioning.cms_toolbars import VersioningToolbar
 
 from djangocms_version_locking.helpers import (
-    content_is_unlocked_for_user,
     get_lock_for_content,
+    lock_is_unlocked_for_user,
 )
 
 
@@ -33,19 +33,20 @@ def new_edit_button(func):
             return
 
         # Check whether current toolbar object has a version lock.
-        if content_is_unlocked_for_user(self.toolbar.obj, self.request.user):
+        # The lock is fetched with its owner and reused for the title below.
+        version_lock = get_lock_for_content(self.toolbar.obj)
+        if lock_is_unlocked_for_user(version_lock, self.request.user):
             # No version lock. Call original func to render edit button.
             func(self, **kwargs)
             return
 
         # Populate a title with the locked author details
-        html_attributes = {}
-        version_lock = get_lock_for_content(self.toolbar.obj)
-        if version_lock:
-            # If the users name is available use it, otherwise use their username
-            html_attributes['title'] = _("Locked with {name}").format(
+        # If the users name is available use it, otherwise use their username
+        html_attributes = {
+            'title': _("Locked with {name}").format(
                 name=version_lock.created_by.get_full_name() or version_lock.created_by.username,
-            )
+            ),
+        }
 
         # There is a version lock for the current object.
         # Add a disabled edit button.
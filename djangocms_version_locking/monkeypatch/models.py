@@ -9,26 +9,68 @@ from djangocms_versioning.exceptions import ConditionFailed
 
 from djangocms_version_locking.helpers import (
     create_version_lock,
-    get_latest_draft_version,
-    remove_version_lock,
+    get_draft_lock_owner,
+    prefetch_version_locks,
+    remove_draft_version_lock,
+    set_draft_version,
     version_is_locked,
 )
 
 
+# Fields of a version deciding whether it should be locked
+LOCK_FIELDS = {'state', 'created_by', 'created_by_id'}
+
+
+def new_from_db(old_from_db):
+    """
+    Override the Versioning from_db method to remember the state and the
+    author a version was loaded with
+    """
+    def inner(cls, db, field_names, values):
+        version = old_from_db(cls, db, field_names, values)
+        version._loaded_state = version.__dict__.get('state')
+        version._loaded_created_by_id = version.__dict__.get('created_by_id')
+        return version
+    return inner
+
+
+models.Version.from_db = classmethod(new_from_db(models.Version.from_db.__func__))
+
+
 def new_save(old_save):
     """
     Override the Versioning save method to add a version lock
     """
     def inner(version, **kwargs):
+        created = version.pk is None
         old_save(version, **kwargs)
+        # Nothing that decides the lock has been saved
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not LOCK_FIELDS.intersection(update_fields):
+            return version
+
+        loaded_state = getattr(version, '_loaded_state', None)
+        loaded_created_by_id = getattr(version, '_loaded_created_by_id', None)
+        version._loaded_state = version.state
+        version._loaded_created_by_id = version.created_by_id
         # A draft version is locked by default
         if version.state == constants.DRAFT:
-            if not version_is_locked(version):
+            state_changed = created or loaded_state != constants.DRAFT
+            # A draft saved again by the same author keeps its lock as it is
+            if not state_changed and version.created_by_id == loaded_created_by_id:
+                return version
+            # A version that has just been created can't be locked yet
+            if created or not version_is_locked(version):
                 # create a lock
                 create_version_lock(version, version.created_by)
-        # A any other state than draft has no lock, an existing lock should be removed
-        else:
-            remove_version_lock(version)
+            # The version has become the draft of its grouping
+            if state_changed:
+                set_draft_version(version)
+        # A any other state than draft has no lock, an existing lock should be removed.
+        # Only drafts are locked, so there is nothing to remove from a new version or
+        # from a version that wasn't a draft when it was loaded
+        elif not created and loaded_state in (None, constants.DRAFT):
+            remove_draft_version_lock(version)
         return version
     return inner
 
@@ -36,6 +78,42 @@ def new_save(old_save):
 models.Version.save = new_save(models.Version.save)
 
 
+def locked(self):
+    """
+    Versions holding a lock
+    """
+    return self.filter(versionlock__isnull=False)
+
+
+def unlocked(self):
+    """
+    Versions without a lock
+    """
+    return self.filter(versionlock__isnull=True)
+
+
+def locked_by(self, user):
+    """
+    Versions locked by `user`, served by the (created_by, version) index of
+    the lock table
+    """
+    return self.filter(versionlock__created_by=user)
+
+
+def _manager_method(name):
+    def inner(self, *args, **kwargs):
+        return getattr(self.get_queryset(), name)(*args, **kwargs)
+    inner.__name__ = name
+    return inner
+
+
+# The version manager copied the queryset methods when it was created, the
+# lock filters are added to both so that Version.objects.locked() works too
+for method in (locked, unlocked, locked_by):
+    setattr(models.VersionQuerySet, method.__name__, method)
+    setattr(type(models.Version.objects), method.__name__, _manager_method(method.__name__))
+
+
 def _is_version_locked(message):
     def inner(version, user):
         lock = version_is_locked(version)
@@ -55,10 +133,9 @@ def _is_draft_version_locked(message):
                     message.format(user="User #{}".format(cached_draft_version_user_id))
                 )
         except AttributeError:
-            draft_version = get_latest_draft_version(version)
-            lock = version_is_locked(draft_version)
-            if lock and lock.created_by != user:
-                raise ConditionFailed(message.format(user=lock.created_by))
+            owner = get_draft_lock_owner(version)
+            if owner and owner != user:
+                raise ConditionFailed(message.format(user=owner))
     return inner
 
 
@@ -73,29 +150,67 @@ models.Version.check_unpublish += [_is_draft_version_locked(draft_error_message)
 models.Version.check_edit_redirect += [_is_draft_version_locked(draft_error_message)]
 
 
+def _get_moderated_children(version):
+    """
+    Find the moderated children of a version in the placeholders of its content
+    """
+    parent = version.content
+    if not getattr(parent, "get_placeholders", None):
+        return []
+
+    grouping_values = version.versionable.grouping_values(parent)
+    return [
+        child_version
+        for placeholder in parent.get_placeholders()
+        for child_version in get_moderated_children_from_placeholder(placeholder, grouping_values)
+    ]
+
+
 def _add_nested_children(self, version, parent_node):
     """
     Helper method which finds moderated children and adds them to the collection if
     it's not locked by a user
+
+    The children are walked level by level, the locks of every level are resolved
+    with a single query and the children of a version are only looked up once.
     """
-    parent = version.content
+    pending = getattr(self, '_pending_nested_children', None)
+    if pending is not None:
+        # Called back by add_version for a child added by the walk below,
+        # queue the child for the next level instead of recursing
+        pending.append((version, parent_node))
+        return 0
+
     added_items = 0
-    if not getattr(parent, "get_placeholders", None):
-        return added_items
-
-    for placeholder in parent.get_placeholders():
-        for child_version in get_moderated_children_from_placeholder(
-                placeholder, version.versionable.grouping_values(parent)
-        ):
-            # Don't add the version if it's locked by another user
-            child_version_locked = version_is_locked(child_version)
-            if not child_version_locked:
-                moderation_request, _added_items = self.add_version(
-                    child_version, parent=parent_node, include_children=True
-                )
-            else:
-                _added_items = self._add_nested_children(child_version, parent_node)
-            added_items += _added_items
+    visited = set()
+    level = [(version, parent_node)]
+    self._pending_nested_children = pending = []
+    try:
+        while level:
+            children = []
+            for level_version, node in level:
+                if level_version.pk in visited:
+                    continue
+                visited.add(level_version.pk)
+                children += [(child_version, node) for child_version in _get_moderated_children(level_version)]
+            prefetch_version_locks(child_version for child_version, node in children)
+
+            level = []
+            for child_version, node in children:
+                # Don't add the version if it's locked by another user
+                child_version_locked = version_is_locked(child_version)
+                if not child_version_locked:
+                    moderation_request, _added_items = self.add_version(
+                        child_version, parent=node, include_children=True
+                    )
+                    added_items += _added_items
+                    level += pending
+                    pending.clear()
+                else:
+                    # The children of a locked version are added in its place
+                    level.append((child_version, node))
+    finally:
+        self._pending_nested_children = None
     return added_items
 
 
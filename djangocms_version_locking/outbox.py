@@ -0,0 +1,211 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.db import connections, router, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .conf import (
+    EMAIL_NOTIFICATIONS_BATCH_SIZE,
+    EMAIL_NOTIFICATIONS_CIRCUIT_BREAKER_COOLDOWN,
+    EMAIL_NOTIFICATIONS_CIRCUIT_BREAKER_THRESHOLD,
+    EMAIL_NOTIFICATIONS_CLAIM_TIMEOUT,
+    EMAIL_NOTIFICATIONS_DIGEST_WINDOW,
+    EMAIL_NOTIFICATIONS_FAIL_SILENTLY,
+    EMAIL_NOTIFICATIONS_MAX_ATTEMPTS,
+    EMAIL_NOTIFICATIONS_RETRY_DELAY,
+)
+from .emails import get_unlock_digest_message, get_unlock_notification_message
+from .models import UnlockNotification
+
+
+class CircuitBreaker:
+    """Stops the outbox from being dispatched for `cooldown` seconds
+    after `threshold` consecutive delivery failures, so that an
+    unavailable mail server isn't hammered with retries
+    """
+
+    def __init__(
+        self,
+        threshold=EMAIL_NOTIFICATIONS_CIRCUIT_BREAKER_THRESHOLD,
+        cooldown=EMAIL_NOTIFICATIONS_CIRCUIT_BREAKER_COOLDOWN,
+    ):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        if self.opened_at is None:
+            return False
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            # Let the next batch through to probe the mail server
+            self.opened_at = None
+            self.failures = 0
+            return False
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+def get_retry_delay(attempts):
+    """Exponential backoff for a notification that failed `attempts` times
+    """
+    return timedelta(seconds=EMAIL_NOTIFICATIONS_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def _claim_notifications(queryset):
+    """Claim the notifications of `queryset` for the running worker by
+    postponing their next attempt by EMAIL_NOTIFICATIONS_CLAIM_TIMEOUT, so
+    that workers running in parallel don't send them too. Rows being claimed
+    by another worker are skipped where the database supports it.
+
+    :return: List of the claimed notifications
+    """
+    db = router.db_for_write(UnlockNotification)
+    if connections[db].features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True)
+    else:
+        queryset = queryset.select_for_update()
+    with transaction.atomic(using=db):
+        notifications = list(queryset.using(db))
+        UnlockNotification.objects.using(db).filter(
+            pk__in=[notification.pk for notification in notifications],
+        ).update(next_attempt=timezone.now() + timedelta(seconds=EMAIL_NOTIFICATIONS_CLAIM_TIMEOUT))
+    return notifications
+
+
+def claim_pending_notifications(batch_size=EMAIL_NOTIFICATIONS_BATCH_SIZE):
+    return _claim_notifications(
+        UnlockNotification.objects
+        .filter(
+            next_attempt__lte=timezone.now(),
+            attempts__lt=EMAIL_NOTIFICATIONS_MAX_ATTEMPTS,
+        )
+        .order_by('next_attempt', 'pk')[:batch_size]
+    )
+
+
+def claim_pending_digests(batch_size=EMAIL_NOTIFICATIONS_BATCH_SIZE, window=EMAIL_NOTIFICATIONS_DIGEST_WINDOW):
+    """Claim the pending notifications grouped by recipient, a recipient is
+    only due once their oldest pending notification has waited for the
+    whole window
+
+    :return: List of lists of notifications, one list per recipient
+    """
+    now = timezone.now()
+    pending = UnlockNotification.objects.filter(
+        next_attempt__lte=now,
+        attempts__lt=EMAIL_NOTIFICATIONS_MAX_ATTEMPTS,
+    )
+    recipients = list(
+        pending
+        .values('recipient')
+        .annotate(first_created=Min('created'))
+        .filter(first_created__lte=now - timedelta(seconds=window))
+        .order_by('first_created')
+        .values_list('recipient', flat=True)[:batch_size]
+    )
+    digests = defaultdict(list)
+    for notification in _claim_notifications(pending.filter(recipient__in=recipients).order_by('created', 'pk')):
+        digests[notification.recipient].append(notification)
+    return list(digests.values())
+
+
+def _record_failure(notification, error):
+    notification.attempts += 1
+    notification.next_attempt = timezone.now() + get_retry_delay(notification.attempts)
+    notification.last_error = str(error)
+
+
+def _get_message(notifications):
+    if len(notifications) == 1:
+        return get_unlock_notification_message(notifications[0])
+    return get_unlock_digest_message(notifications)
+
+
+def dispatch_notifications(batch_size=EMAIL_NOTIFICATIONS_BATCH_SIZE, circuit_breaker=None):
+    """Send a batch of pending unlock notifications over a single mail
+    connection. Delivered notifications are removed from the outbox, failed
+    ones are rescheduled with an exponential backoff until they run out of
+    attempts.
+
+    When EMAIL_NOTIFICATIONS_DIGEST_WINDOW is set the notifications of each
+    recipient are coalesced into one digest email, rendered once per recipient.
+
+    EMAIL_NOTIFICATIONS_FAIL_SILENTLY is passed on to the mail connection, when
+    set delivery errors are swallowed by the backend and the notifications are
+    treated as delivered, as they are when sent synchronously.
+
+    :param batch_size: Maximum number of emails to send
+    :param circuit_breaker: Optional CircuitBreaker shared between batches
+    :return: Tuple of the number of delivered and failed emails
+    """
+    if circuit_breaker is None:
+        circuit_breaker = CircuitBreaker()
+    if circuit_breaker.is_open:
+        return 0, 0
+
+    if EMAIL_NOTIFICATIONS_DIGEST_WINDOW:
+        batches = claim_pending_digests(batch_size, window=EMAIL_NOTIFICATIONS_DIGEST_WINDOW)
+    else:
+        batches = [[notification] for notification in claim_pending_notifications(batch_size)]
+    if not batches:
+        return 0, 0
+
+    delivered = []
+    failed = []
+    unsent = []
+    connection = get_connection(fail_silently=EMAIL_NOTIFICATIONS_FAIL_SILENTLY)
+    try:
+        connection.open()
+    except Exception as error:
+        for notifications in batches:
+            for notification in notifications:
+                _record_failure(notification, error)
+        failed = batches
+        circuit_breaker.record_failure()
+    else:
+        try:
+            for index, notifications in enumerate(batches):
+                if circuit_breaker.is_open:
+                    unsent = batches[index:]
+                    break
+                try:
+                    connection.send_messages([_get_message(notifications)])
+                except Exception as error:
+                    for notification in notifications:
+                        _record_failure(notification, error)
+                    failed.append(notifications)
+                    circuit_breaker.record_failure()
+                else:
+                    delivered.append(notifications)
+                    circuit_breaker.record_success()
+        finally:
+            connection.close()
+
+    if delivered:
+        UnlockNotification.objects.filter(
+            pk__in=[notification.pk for notifications in delivered for notification in notifications]
+        ).delete()
+    if failed:
+        UnlockNotification.objects.bulk_update(
+            [notification for notifications in failed for notification in notifications],
+            ['attempts', 'next_attempt', 'last_error'],
+        )
+    if unsent:
+        # Released for the next batch rather than held until the claim times out
+        UnlockNotification.objects.filter(
+            pk__in=[notification.pk for notifications in unsent for notification in notifications]
+        ).update(next_attempt=timezone.now())
+    return len(delivered), len(failed)
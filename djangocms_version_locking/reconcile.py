@@ -0,0 +1,158 @@
+from django.db import transaction
+
+from djangocms_versioning import constants
+from djangocms_versioning.models import Version
+
+from .cache import invalidate_version_lock
+from .helpers import get_grouping_key
+from .models import DraftLockOwner, VersionLock
+
+
+def _iter_chunks(queryset, chunk_size):
+    """Stream the rows of a values_list queryset, whose first value is the
+    primary key, in chunks fetched with keyset pagination. Unlike offsets
+    or an open cursor this stays linear and consistent while the scanned
+    tables are being repaired.
+    """
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page.order_by('pk')[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1][0]
+
+
+def _invalidate_versions(versions):
+    for version_id, content_type_id, object_id in versions:
+        invalidate_version_lock(Version(pk=version_id, content_type_id=content_type_id, object_id=object_id))
+
+
+def reconcile_unlocked_drafts(chunk_size, repair=False):
+    """Find the drafts without a lock, on repair they are locked to their
+    author. Drafts of deactivated users are left unlocked, as their locks
+    are released by reconcile_inactive_user_locks.
+
+    :return: Number of drafts found
+    """
+    queryset = Version.objects.filter(
+        state=constants.DRAFT,
+        versionlock__isnull=True,
+        created_by__is_active=True,
+    ).values_list(
+        'pk', 'content_type_id', 'object_id', 'created_by_id',
+    )
+    found = 0
+    for rows in _iter_chunks(queryset, chunk_size):
+        found += len(rows)
+        if not repair:
+            continue
+        with transaction.atomic():
+            VersionLock.objects.bulk_create(
+                [
+                    VersionLock(version_id=row[0], content_type_id=row[1], object_id=row[2], created_by_id=row[3])
+                    for row in rows
+                ],
+                ignore_conflicts=True,
+            )
+            _invalidate_versions(row[:3] for row in rows)
+    return found
+
+
+def reconcile_stray_locks(chunk_size, repair=False):
+    """Find the locks of versions that aren't drafts, on repair they are removed
+
+    :return: Number of locks found
+    """
+    queryset = VersionLock.objects.exclude(version__state=constants.DRAFT).values_list(
+        'pk', 'version_id', 'version__content_type_id', 'version__object_id',
+    )
+    found = 0
+    for rows in _iter_chunks(queryset, chunk_size):
+        found += len(rows)
+        if not repair:
+            continue
+        with transaction.atomic():
+            (
+                VersionLock.objects
+                .filter(pk__in=[row[0] for row in rows])
+                .exclude(version__state=constants.DRAFT)
+                .delete()
+            )
+            _invalidate_versions(row[1:] for row in rows)
+    return found
+
+
+def reconcile_unrecorded_drafts(chunk_size, repair=False):
+    """Find the drafts that aren't recorded as the draft of their grouping,
+    such as the drafts saved before the records were introduced. On repair
+    they are recorded.
+
+    :return: Number of drafts found
+    """
+    queryset = Version.objects.filter(state=constants.DRAFT).values_list('pk')
+    found = 0
+    for rows in _iter_chunks(queryset, chunk_size):
+        drafts = {
+            get_grouping_key(version.content): version
+            for version in Version.objects.filter(pk__in=[row[0] for row in rows]).prefetch_related('content')
+        }
+        recorded = dict(DraftLockOwner.objects.filter(pk__in=list(drafts)).values_list('pk', 'version_id'))
+        unrecorded = [
+            DraftLockOwner(key=key, version=version)
+            for key, version in drafts.items() if recorded.get(key) != version.pk
+        ]
+        found += len(unrecorded)
+        if not repair or not unrecorded:
+            continue
+        with transaction.atomic():
+            DraftLockOwner.objects.filter(pk__in=[draft.key for draft in unrecorded]).delete()
+            # A draft saved in the meantime has recorded itself
+            DraftLockOwner.objects.bulk_create(unrecorded, ignore_conflicts=True)
+    return found
+
+
+def reconcile_stray_draft_records(chunk_size, repair=False):
+    """Find the versions recorded as the draft of their grouping that aren't
+    drafts, on repair the groupings are recorded without a draft
+
+    :return: Number of records found
+    """
+    queryset = DraftLockOwner.objects.exclude(version=None).exclude(version__state=constants.DRAFT).values_list('pk')
+    found = 0
+    for rows in _iter_chunks(queryset, chunk_size):
+        found += len(rows)
+        if not repair:
+            continue
+        (
+            DraftLockOwner.objects
+            .filter(pk__in=[row[0] for row in rows])
+            .exclude(version__state=constants.DRAFT)
+            .update(version=None)
+        )
+    return found
+
+
+def reconcile_inactive_user_locks(chunk_size, repair=False, reassign_to=None):
+    """Find the locks held by deactivated users, on repair they are
+    reassigned to `reassign_to` or released when it isn't given
+
+    :return: Number of locks found
+    """
+    queryset = VersionLock.objects.filter(created_by__is_active=False).values_list(
+        'pk', 'version_id', 'version__content_type_id', 'version__object_id',
+    )
+    found = 0
+    for rows in _iter_chunks(queryset, chunk_size):
+        found += len(rows)
+        if not repair:
+            continue
+        with transaction.atomic():
+            locks = VersionLock.objects.filter(pk__in=[row[0] for row in rows])
+            if reassign_to is None:
+                locks.delete()
+            else:
+                locks.update(created_by=reassign_to)
+            _invalidate_versions(row[1:] for row in rows)
+    return found
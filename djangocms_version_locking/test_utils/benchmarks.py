@@ -0,0 +1,106 @@
+import json
+import os
+import statistics
+import sys
+import time
+
+from django import get_version
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from djangocms_versioning import constants
+from djangocms_versioning.models import Version
+
+from ..models import VersionLock
+from .polls.models import Poll, PollContent
+
+
+# Benchmarks only run when this environment variable is set
+BENCHMARKS_ENV = 'VERSION_LOCKING_BENCHMARKS'
+# Comma separated numbers of versions in the database the benchmarks run against
+BENCHMARK_SIZES_ENV = 'VERSION_LOCKING_BENCHMARK_SIZES'
+# File the JSON results are written to, they are written to stdout when not set
+BENCHMARK_OUTPUT_ENV = 'VERSION_LOCKING_BENCHMARK_OUTPUT'
+
+DEFAULT_BENCHMARK_SIZES = (10, 1000, 100000)
+
+
+def benchmarks_enabled():
+    return bool(os.environ.get(BENCHMARKS_ENV))
+
+
+def get_benchmark_sizes():
+    sizes = os.environ.get(BENCHMARK_SIZES_ENV)
+    if not sizes:
+        return DEFAULT_BENCHMARK_SIZES
+    return tuple(sorted(int(size) for size in sizes.split(',')))
+
+
+def create_locked_poll_versions(count, user, batch_size=1000):
+    """Bulk create `count` polls, each with a draft version locked to `user`,
+    bypassing the factories so that large datasets are created quickly
+    """
+    content_type = ContentType.objects.get_for_model(PollContent)
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        polls = Poll.objects.bulk_create([Poll(name='benchmark') for _ in range(size)])
+        contents = PollContent.objects.bulk_create([
+            PollContent(poll=poll, language='en', text='benchmark') for poll in polls
+        ])
+        # Not every backend returns the primary keys of bulk inserted rows
+        if contents[0].pk is None:
+            contents = list(PollContent.objects.filter(poll__in=polls))
+        Version.objects.bulk_create([
+            Version(content_type=content_type, object_id=content.pk, created_by=user, state=constants.DRAFT)
+            for content in contents
+        ])
+        versions = Version.objects.filter(content_type=content_type, object_id__in=[content.pk for content in contents])
+        VersionLock.objects.bulk_create([
+            VersionLock(version=version, content_type=content_type, object_id=version.object_id, created_by=user)
+            for version in versions
+        ])
+
+
+def measure(name, size, func, setup=None, repeat=5):
+    """Time `func` and count the queries it issues
+
+    :param setup: Optional callable run before every call, its return
+        value is passed to `func` and it isn't timed
+    :return: Dict of the results, times are in milliseconds
+    """
+    timings = []
+    query_counts = []
+    for _ in range(repeat):
+        args = (setup(), ) if setup else ()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            func(*args)
+            timings.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(queries))
+    return {
+        'name': name,
+        'size': size,
+        'repeat': repeat,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'queries': max(query_counts),
+    }
+
+
+def write_results(results):
+    """Write the results as JSON, to the file set by
+    VERSION_LOCKING_BENCHMARK_OUTPUT or to stdout
+    """
+    report = {
+        'django': get_version(),
+        'database': connection.vendor,
+        'results': results,
+    }
+    path = os.environ.get(BENCHMARK_OUTPUT_ENV)
+    if path:
+        with open(path, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+
+urlpatterns = [
+    path('lock-events/', views.lock_events, name='djangocms_version_locking_lock_events'),
+    path('unlock/<int:version_id>/', views.unlock_version, name='djangocms_version_locking_unlock'),
+]
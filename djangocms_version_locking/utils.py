@@ -1,18 +1,109 @@
 from __future__ import unicode_literals
 
+from collections import namedtuple
 from urllib.parse import urljoin
 
 from django.conf import settings
 from django.contrib.sites.models import Site
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
 
 
-def get_absolute_url(location, site=None):
-    if not site:
-        site = Site.objects.get_current()
+# Stand-ins substituted with the real values in the memoised fragments and urls
+UNLOCK_URL_PLACEHOLDER = 'djangocms-version-locking-unlock-url'
+PK_PLACEHOLDER = 'djangocms-version-locking-pk'
+
+_fragment_cache = {}
+_url_cache = {}
+_site_cache = {}
+
+SiteContext = namedtuple('SiteContext', ['name', 'base_url'])
+
+
+@receiver(post_save, sender=Site, dispatch_uid="djangocms_version_locking_clear_site_cache_on_save")
+@receiver(post_delete, sender=Site, dispatch_uid="djangocms_version_locking_clear_site_cache_on_delete")
+def clear_site_cache(**kwargs):
+    _site_cache.clear()
+
 
+def _get_site_context(site):
     if getattr(settings, 'USE_HTTPS', False):
         scheme = 'https'
     else:
         scheme = 'http'
-    domain = '{}://{}'.format(scheme, site.domain)
-    return urljoin(domain, location)
+    return SiteContext(
+        name=site.name,
+        base_url='{}://{}'.format(scheme, site.domain),
+    )
+
+
+def get_site_context(site=None):
+    """Return the name and the base url (scheme and domain) of a site,
+    by default of the current site. The context of the current site is
+    only computed once and dropped when a site is saved or deleted.
+    """
+    if site is not None:
+        return _get_site_context(site)
+
+    site_id = getattr(settings, 'SITE_ID', None)
+    if site_id is None:
+        return _get_site_context(Site.objects.get_current())
+    if site_id not in _site_cache:
+        _site_cache[site_id] = _get_site_context(Site.objects.get_current())
+    return _site_cache[site_id]
+
+
+def get_absolute_url(location, site=None):
+    """
+    :param site: Site instance or SiteContext, the current site by default
+    """
+    if not isinstance(site, SiteContext):
+        site = get_site_context(site)
+    return urljoin(site.base_url, location)
+
+
+@receiver(setting_changed, dispatch_uid="djangocms_version_locking_clear_fragment_cache")
+def clear_fragment_cache(**kwargs):
+    _fragment_cache.clear()
+    _url_cache.clear()
+    _site_cache.clear()
+
+
+def render_cached_fragment(template_name, context=None):
+    """Render a template whose output only depends on the context and the
+    active language once per process
+
+    :param context: Dict of hashable values
+    """
+    context = context or {}
+    key = (template_name, get_language(), tuple(sorted(context.items())))
+    if key not in _fragment_cache:
+        _fragment_cache[key] = render_to_string(template_name, context)
+    return _fragment_cache[key]
+
+
+def render_unlock_icon(unlock_url, disabled):
+    """Render the unlock icon, only one rendering per disabled state and
+    language is done, the url is substituted into it
+    """
+    fragment = render_cached_fragment(
+        'djangocms_version_locking/admin/unlock_icon.html',
+        {'unlock_url': UNLOCK_URL_PLACEHOLDER, 'disabled': disabled},
+    )
+    return mark_safe(fragment.replace(UNLOCK_URL_PLACEHOLDER, conditional_escape(unlock_url)))
+
+
+def get_cached_admin_url(name, pk):
+    """Reverse an admin url taking a single object id, the url is only
+    reversed once and the id substituted into it
+    """
+    key = (name, get_script_prefix(), get_urlconf())
+    if key not in _url_cache:
+        _url_cache[key] = reverse(name, args=(PK_PLACEHOLDER,))
+    return _url_cache[key].replace(PK_PLACEHOLDER, str(pk))
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import re
+
+from django.contrib.auth import get_permission_codename
+from django.contrib.contenttypes.models import ContentType
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.encoding import force_str
+from django.utils.translation import gettext_lazy as _
+
+from asgiref.sync import sync_to_async
+from djangocms_versioning import constants, versionables
+from djangocms_versioning.models import Version
+
+from .conf import (
+    VERSION_LOCKING_EVENT_KEEPALIVE,
+    VERSION_LOCKING_EVENT_STREAM_TIMEOUT,
+)
+from .emails import unlock_version_and_notify_author
+from .events import get_broker
+from .helpers import get_lock_status
+
+
+CHANNEL_RE = re.compile(r'^\d+:\d+$')
+
+
+async def _stream_events(subscription):
+    loop = asyncio.get_running_loop()
+    closes_at = loop.time() + VERSION_LOCKING_EVENT_STREAM_TIMEOUT
+    try:
+        # Flush the headers so that the client knows it's subscribed
+        yield ': subscribed\n\n'
+        # The stream ends on its own, clients that are still listening reconnect
+        while loop.time() < closes_at:
+            timeout = min(VERSION_LOCKING_EVENT_KEEPALIVE, closes_at - loop.time())
+            try:
+                event = await subscription.get(timeout=timeout)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing idle connections
+                yield ': keepalive\n\n'
+                continue
+            yield 'event: lock\ndata: {}\n\n'.format(json.dumps(event))
+    finally:
+        subscription.close()
+
+
+def _is_staff(user):
+    return user.is_active and user.is_staff
+
+
+def _can_follow(user, channels):
+    """Check that the user can view the versions of the content types of
+    every channel, as required by the lock-status endpoint of their admin
+    """
+    if not _is_staff(user):
+        return False
+    for content_type_id in {int(channel.split(':')[0]) for channel in channels}:
+        try:
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            versionable = versionables.for_content(model)
+        except (ContentType.DoesNotExist, KeyError):
+            return False
+        opts = versionable.version_model_proxy._meta
+        if not any(
+            user.has_perm('{}.{}'.format(opts.app_label, get_permission_codename(action, opts)))
+            for action in ('view', 'change')
+        ):
+            return False
+    return True
+
+
+async def lock_events(request):
+    """
+    Stream the lock changes of the content objects listed in the `content`
+    GET parameter, as comma separated `<content type id>:<object id>` pairs,
+    as Server-Sent Events. Requires an ASGI server.
+    """
+    broker = get_broker()
+    if broker is None:
+        raise Http404
+
+    channels = [channel for channel in request.GET.get('content', '').split(',') if channel]
+    if not channels or not all(CHANNEL_RE.match(channel) for channel in channels):
+        return HttpResponseBadRequest(force_str(_("Contents must be comma separated content type and object ids")))
+
+    if not await sync_to_async(_can_follow)(request.user, channels):
+        return HttpResponseForbidden(force_str(_("You do not have permission to follow the version locks")))
+
+    subscription = broker.subscribe(channels)
+    response = StreamingHttpResponse(_stream_events(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _can_unlock(user):
+    return _is_staff(user) and user.has_perm('djangocms_version_locking.delete_versionlock')
+
+
+async def unlock_version(request, version_id):
+    """
+    Async counterpart of the unlock view of the version admin, answers
+    with the new lock status as JSON instead of redirecting
+    """
+    # This view always changes data so only POST requests should work
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'], _('This view only supports POST method.'))
+
+    # Check that the user has unlock permission
+    if not await sync_to_async(_can_unlock)(request.user):
+        return HttpResponseForbidden(force_str(_("You do not have permission to remove the version lock")))
+
+    version = await Version.objects.select_related('created_by').filter(pk=version_id).afirst()
+    # Raise 404 if the version doesn't exist or isn't a draft
+    if version is None or version.state != constants.DRAFT:
+        raise Http404
+
+    # Unlocks in a transaction along with queuing the notification, the
+    # user has been loaded by the permission check
+    await sync_to_async(unlock_version_and_notify_author)(version, request.user)
+    return JsonResponse(dict(get_lock_status(None), version=version.pk))
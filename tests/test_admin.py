@@ -2,18 +2,23 @@ from unittest import skip
 from unittest.mock import patch
 
 from django.contrib import admin
+from django.db import connection
 from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.utils.translation import gettext_lazy as _
 
 from cms.test_utils.testcases import CMSTestCase
 
 from djangocms_alias.models import Alias, AliasContent, Category
 from djangocms_versioning import admin as versioning_admin
-from djangocms_versioning.constants import DRAFT, PUBLISHED
+from djangocms_versioning.constants import ARCHIVED, DRAFT, PUBLISHED
+from djangocms_versioning.exceptions import ConditionFailed
+from djangocms_versioning.helpers import version_list_url
 from djangocms_versioning.models import Version
 
 import djangocms_version_locking.helpers
 from djangocms_version_locking.admin import VersionLockAdminMixin
+from djangocms_version_locking.cms_config import add_alias_version_lock
 from djangocms_version_locking.helpers import (
     replace_admin_for_models,
     version_lock_admin_factory,
@@ -116,6 +121,97 @@ class AdminLockedFieldTestCase(CMSTestCase):
         self.assertNotEqual("", self.hijacked_admin.locked(draft_version))
 
 
+class AdminLockedFieldQueryCountTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.superuser = self.get_superuser()
+        self.version_admin = admin.site._registry[PollsCMSConfig.versioning[0].version_model_proxy]
+
+    def _render_lock_columns(self, versions):
+        request = RequestFactory().get('/')
+        request.user = self.superuser
+        queryset = self.version_admin.get_queryset(request).filter(pk__in=[version.pk for version in versions])
+
+        for version in queryset:
+            self.version_admin.locked(version)
+            self.version_admin._get_unlock_link(version, request)
+
+    def test_lock_columns_query_count_does_not_depend_on_row_count(self):
+        """
+        The lock state of every row is read from the changelist queryset
+        """
+        for row_count in (1, 10):
+            versions = factories.PollVersionFactory.create_batch(row_count)
+
+            with self.assertNumQueries(1):
+                self._render_lock_columns(versions)
+
+    def _get_changelist_rows(self, versions):
+        request = RequestFactory().get(version_list_url(versions[0].content))
+        request.user = self.superuser
+        changelist = self.version_admin.get_changelist_instance(request)
+        return changelist.get_queryset(request).filter(pk__in=[version.pk for version in versions])
+
+    def _check_rows(self, versions, user):
+        return {version.pk: version.check_revert.as_bool(user) for version in self._get_changelist_rows(versions)}
+
+    def _create_locked_grouping(self):
+        archived = factories.PollVersionFactory(state=ARCHIVED)
+        draft = factories.PollVersionFactory(content__poll=archived.content.poll, created_by=self.superuser)
+        return archived, draft
+
+    def test_draft_lock_checks_query_count_does_not_depend_on_row_count(self):
+        """
+        The owner of the draft lock of every row is annotated on the changelist queryset
+        """
+        other_user = factories.UserFactory()
+        query_counts = []
+        for row_count in (1, 10):
+            archived, _ = self._create_locked_grouping()
+            versions = [archived] + factories.PollVersionFactory.create_batch(
+                row_count - 1, content__poll=archived.content.poll, state=ARCHIVED,
+            )
+            rows = self._get_changelist_rows(versions)
+
+            with CaptureQueriesContext(connection) as queries:
+                checks = {version.pk: version.check_revert.as_bool(other_user) for version in rows}
+
+            self.assertEqual(len(checks), row_count)
+            self.assertEqual(set(checks.values()), {False})
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_annotated_draft_lock_owner_matches_the_draft_lock(self):
+        archived, draft = self._create_locked_grouping()
+        unlocked_archived = factories.PollVersionFactory(state=ARCHIVED)
+
+        annotated = {
+            version.pk: version._draft_version_user_id
+            for versions in ([archived, draft], [unlocked_archived])
+            for version in self._get_changelist_rows(versions)
+        }
+
+        self.assertEqual(annotated, {
+            archived.pk: self.superuser.pk,
+            draft.pk: self.superuser.pk,
+            unlocked_archived.pk: None,
+        })
+        self.assertTrue(self._check_rows([archived], self.superuser)[archived.pk])
+        self.assertTrue(self._check_rows([unlocked_archived], factories.UserFactory())[unlocked_archived.pk])
+
+    def test_single_version_views_name_the_draft_lock_owner(self):
+        archived, _ = self._create_locked_grouping()
+        request = RequestFactory().get('/')
+        request.user = self.superuser
+
+        version = self.version_admin.get_object(request, str(archived.pk))
+
+        self.assertFalse(hasattr(version, '_draft_version_user_id'))
+        with self.assertRaisesMessage(ConditionFailed, str(self.superuser)):
+            version.check_revert(factories.UserFactory())
+
+
 class AdminPermissionTestCase(CMSTestCase):
 
     @classmethod
@@ -205,3 +301,19 @@ class AdminExtensionTestCase(CMSTestCase):
         self.assertNotContains(response, '<a class="btn cms-versioning-action-btn inactive" title="Locked">')
         self.assertNotContains(response, '<img src="/static/djangocms_version_locking/svg/lock.svg">')
         self.assertContains(response, self.alias_content.name)
+
+    def test_version_lock_for_alias_is_read_from_the_changelist_queryset(self):
+        """
+        The versions and locks are prefetched so the name field modifier doesn't query per row
+        """
+        Version.objects.create(content=self.alias_content, created_by=self.superuser, state=DRAFT)
+        alias_admin = admin.site._registry[AliasContent]
+        request = RequestFactory().get('/')
+        request.user = self.superuser
+        contents = list(alias_admin.get_queryset(request))
+
+        with self.assertNumQueries(0):
+            names = [add_alias_version_lock(content, "name") for content in contents]
+
+        self.assertIn('cms-version-locked-status-icon', names[0])
+        self.assertIn(self.alias_content.name, names[0])
@@ -1,15 +1,21 @@
+from smtplib import SMTPException
 from unittest import skip
+from unittest.mock import patch
 
 from django.contrib import admin
 from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.db import connection
 from django.template.loader import render_to_string
 from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 
 from cms.test_utils.testcases import CMSTestCase
 
 from djangocms_versioning import constants
 from djangocms_versioning.helpers import version_list_url
 from djangocms_versioning.models import Version
+from djangocms_versioning.test_utils.factories import PageVersionFactory
 
 from djangocms_version_locking.models import VersionLock
 from djangocms_version_locking.test_utils import factories
@@ -213,6 +219,69 @@ class VersionLockUnlockTestCase(CMSTestCase):
         self.assertEqual(updated_draft_version.versionlock.created_by, self.user_has_no_unlock_perms)
 
 
+class VersionLockBulkUnlockActionTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user_has_unlock_perms = self._create_user(
+            "user_has_unlock_perms",
+            is_staff=True,
+            permissions=["change_pollcontentversion", "delete_versionlock"],
+        )
+        self.user_has_no_unlock_perms = self._create_user(
+            "user_has_no_unlock_perms",
+            is_staff=True,
+            permissions=["change_pollcontentversion"],
+        )
+        self.version_admin = admin.site._registry[PollsCMSConfig.versioning[0].version_model_proxy]
+
+    def _get_request(self, user):
+        request = RequestFactory().post('/')
+        request.user = user
+        return request
+
+    def test_unlock_action_only_available_with_unlock_permission(self):
+        allowed = self.version_admin.get_actions(self._get_request(self.user_has_unlock_perms))
+        denied = self.version_admin.get_actions(self._get_request(self.user_has_no_unlock_perms))
+
+        self.assertIn('unlock_versions', allowed)
+        self.assertNotIn('unlock_versions', denied)
+
+    @patch('djangocms_version_locking.monkeypatch.admin.messages')
+    def test_unlock_action_removes_all_selected_locks_at_once(self, mocked_messages):
+        drafts = factories.PollVersionFactory.create_batch(3)
+        own_draft = factories.PollVersionFactory(created_by=self.user_has_unlock_perms)
+        published = factories.PollVersionFactory(state=constants.PUBLISHED)
+        queryset = Version.objects.filter(pk__in=[version.pk for version in drafts + [own_draft, published]])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.version_admin.unlock_versions(self._get_request(self.user_has_unlock_perms), queryset)
+        lock_deletes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('DELETE') and 'djangocms_version_locking_versionlock' in query['sql']
+        ]
+
+        self.assertEqual(len(lock_deletes), 1)
+        self.assertFalse(VersionLock.objects.filter(version__in=drafts + [own_draft]).exists())
+        # The user unlocking their own draft isn't notified
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            sorted(version.created_by.email for version in drafts),
+        )
+
+    @patch('djangocms_version_locking.monkeypatch.admin.messages')
+    @patch('djangocms_version_locking.emails.get_connection')
+    def test_mail_error_does_not_undo_the_unlock_action(self, mocked_get_connection, mocked_messages):
+        mocked_get_connection.return_value.send_messages.side_effect = SMTPException
+        drafts = factories.PollVersionFactory.create_batch(3)
+        queryset = Version.objects.filter(pk__in=[version.pk for version in drafts])
+
+        with self.assertRaises(SMTPException):
+            self.version_admin.unlock_versions(self._get_request(self.user_has_unlock_perms), queryset)
+
+        self.assertFalse(VersionLock.objects.filter(version__in=drafts).exists())
+
+
 class VersionLockEditActionStateTestCase(CMSTestCase):
 
     def setUp(self):
@@ -273,6 +342,121 @@ class VersionLockEditActionSideFrameTestCase(CMSTestCase):
         self.assertNotIn("js-versioning-close-sideframe", actual_enabled_state)
 
 
+class VersionLockFragmentRenderingTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.superuser = self.get_superuser()
+        self.versionable = PollsCMSConfig.versioning[0]
+        self.version_admin = admin.site._registry[self.versionable.version_model_proxy]
+
+    def test_unlock_link_matches_template_rendering(self):
+        version = factories.PollVersionFactory()
+        request = RequestFactory().get('/')
+        request.user = self.superuser
+        unlock_url = self.get_admin_url(self.versionable.version_model_proxy, 'unlock', version.pk)
+
+        self.assertEqual(
+            self.version_admin._get_unlock_link(version, request),
+            render_to_string(
+                'djangocms_version_locking/admin/unlock_icon.html',
+                {'unlock_url': unlock_url, 'disabled': False},
+            ),
+        )
+
+    def test_fragments_are_rendered_once_for_many_rows(self):
+        versions = factories.PollVersionFactory.create_batch(20)
+        request = RequestFactory().get('/')
+        request.user = self.superuser
+
+        with patch('djangocms_version_locking.utils.render_to_string', wraps=render_to_string) as mocked_render:
+            unlock_links = [self.version_admin._get_unlock_link(version, request) for version in versions]
+            locked_icons = [self.version_admin.locked(version) for version in versions]
+
+        self.assertLessEqual(mocked_render.call_count, 2)
+        self.assertEqual(len(set(locked_icons)), 1)
+        for version, unlock_link in zip(versions, unlock_links):
+            self.assertIn(
+                self.get_admin_url(self.versionable.version_model_proxy, 'unlock', version.pk),
+                unlock_link,
+            )
+
+
+class VersionLockStatusViewTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.superuser = self.get_superuser()
+        self.versionable = PollsCMSConfig.versioning[0]
+        self.locked_version = factories.PollVersionFactory(created_by=self.superuser)
+        self.unlocked_version = factories.PollVersionFactory(state=constants.PUBLISHED)
+        self.lock_status_url = self.get_admin_url(self.versionable.version_model_proxy, 'lock_status')
+
+    def _get_lock_status(self, **headers):
+        with self.login_user_context(self.superuser):
+            return self.client.get(self.lock_status_url, {
+                'version': '{},{}'.format(self.locked_version.pk, self.unlocked_version.pk),
+                'content': str(self.locked_version.content.pk),
+            }, **headers)
+
+    def test_lock_statuses_are_read_with_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get_lock_status()
+
+        lock_queries = [
+            query['sql'] for query in queries.captured_queries
+            if VersionLock._meta.db_table in query['sql']
+        ]
+        self.assertEqual(len(lock_queries), 1)
+        self.assertEqual(response.status_code, 200)
+        expected_lock = {
+            'locked': True,
+            'owner': {
+                'id': self.superuser.pk,
+                'name': self.superuser.get_full_name() or self.superuser.username,
+            },
+            'since': self.locked_version.versionlock.created.isoformat(),
+        }
+        self.assertEqual(response.json(), {
+            'versions': {
+                str(self.locked_version.pk): expected_lock,
+                str(self.unlocked_version.pk): {'locked': False},
+            },
+            'contents': {str(self.locked_version.content.pk): expected_lock},
+        })
+
+    def test_unchanged_locks_are_not_modified(self):
+        etag = self._get_lock_status()['ETag']
+
+        self.assertEqual(self._get_lock_status(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        VersionLock.objects.filter(version=self.locked_version).delete()
+        response = self._get_lock_status(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_locks_of_other_content_types_are_not_reported(self):
+        page_version = PageVersionFactory(created_by=self.superuser)
+
+        with self.login_user_context(self.superuser):
+            response = self.client.get(self.lock_status_url, {'version': str(page_version.pk)})
+
+        self.assertEqual(response.json()['versions'], {str(page_version.pk): {'locked': False}})
+
+    def test_invalid_ids_are_rejected(self):
+        with self.login_user_context(self.superuser):
+            response = self.client.get(self.lock_status_url, {'version': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_staff_without_permission_is_forbidden(self):
+        user = self.get_staff_user_with_no_permissions()
+
+        with self.login_user_context(user):
+            response = self.client.get(self.lock_status_url, {'version': str(self.locked_version.pk)})
+
+        self.assertEqual(response.status_code, 403)
+
+
 class VersionLockMediaMonkeyPatchTestCase(CMSTestCase):
 
     def setUp(self):
@@ -290,3 +474,57 @@ class VersionLockMediaMonkeyPatchTestCase(CMSTestCase):
             response = self.client.post(changelist_url)
 
         self.assertContains(response, css_file)
+
+
+class VersionLockFilterTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.superuser = self.get_superuser()
+        self.other_user = factories.UserFactory(first_name='Other', last_name='Editor')
+        self.published_version = factories.PollVersionFactory(state=constants.PUBLISHED)
+        poll = self.published_version.content.poll
+        self.my_version = factories.PollVersionFactory(content__poll=poll, created_by=self.superuser)
+        self.other_version = factories.PollVersionFactory(content__poll=poll, created_by=self.other_user)
+        self.changelist_url = version_list_url(self.published_version.content)
+
+    def _get_changelist_versions(self, **params):
+        with self.login_user_context(self.superuser):
+            response = self.client.get(self.changelist_url, params)
+        return set(response.context['cl'].result_list)
+
+    def test_lock_filters(self):
+        all_versions = {self.published_version, self.my_version, self.other_version}
+
+        self.assertEqual(self._get_changelist_versions(), all_versions)
+        self.assertEqual(self._get_changelist_versions(locked='yes'), {self.my_version, self.other_version})
+        self.assertEqual(self._get_changelist_versions(locked='mine'), {self.my_version})
+        self.assertEqual(self._get_changelist_versions(locked='no'), {self.published_version})
+        self.assertEqual(self._get_changelist_versions(locked_by=self.other_user.pk), {self.other_version})
+
+    def test_owner_filter_lists_the_lock_owners(self):
+        with self.login_user_context(self.superuser):
+            response = self.client.get(self.changelist_url)
+
+        owner_filter = [
+            spec for spec in response.context['cl'].filter_specs if spec.parameter_name == 'locked_by'
+        ][0]
+        self.assertEqual(owner_filter.lookup_choices, [(str(self.other_user.pk), 'Other Editor')])
+
+    def test_locked_column_is_ordered_by_the_lock(self):
+        versionable = PollsCMSConfig.versioning[0]
+        version_admin = admin.site._registry[versionable.version_model_proxy]
+        request = RequestFactory().get('/')
+        request.user = self.superuser
+
+        queryset = version_admin.get_queryset(request).filter(
+            pk__in=[self.published_version.pk, self.other_version.pk],
+        )
+
+        self.assertEqual(
+            list(queryset.order_by(version_admin.locked.admin_order_field).values_list('pk', flat=True)),
+            [self.published_version.pk, self.other_version.pk],
+        )
+        self.assertEqual(
+            list(queryset.order_by(version_admin.locked.admin_order_field.desc()).values_list('pk', flat=True)),
+            [self.other_version.pk, self.published_version.pk],
+        )
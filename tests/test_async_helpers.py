@@ -0,0 +1,163 @@
+import json
+from unittest.mock import Mock, patch
+
+from django.core import mail
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.http import Http404
+from django.test import AsyncRequestFactory, override_settings
+
+from cms.test_utils.testcases import CMSTestCase
+
+from asgiref.sync import async_to_sync
+from djangocms_versioning import constants
+from djangocms_versioning.models import Version
+
+from djangocms_version_locking.helpers import (
+    acontent_is_unlocked_for_user,
+    acreate_version_lock,
+    aget_lock_for_content,
+    aremove_version_lock,
+    aversion_is_locked,
+    aversion_is_unlocked_for_user,
+)
+from djangocms_version_locking.models import VersionLock
+from djangocms_version_locking.test_utils import factories
+from djangocms_version_locking.views import unlock_version
+
+
+class AsyncLockHelpersTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user = self.get_superuser()
+        self.other_user = factories.UserFactory(is_staff=True)
+        self.version = factories.PollVersionFactory(created_by=self.user)
+        self.other_version = factories.PollVersionFactory(created_by=self.other_user)
+        self.published_version = factories.PollVersionFactory(created_by=self.user, state=constants.PUBLISHED)
+
+    async def test_lock_lookups(self):
+        lock = await aget_lock_for_content(self.version.content)
+
+        self.assertEqual(lock.created_by, self.user)
+        self.assertTrue(await acontent_is_unlocked_for_user(self.version.content, self.user))
+        self.assertFalse(await acontent_is_unlocked_for_user(self.version.content, self.other_user))
+        self.assertEqual(await aversion_is_locked(self.version), lock)
+        self.assertFalse(await aversion_is_unlocked_for_user(self.version, self.other_user))
+
+    async def test_remove_and_create_lock(self):
+        deleted, _ = await aremove_version_lock(self.version)
+
+        self.assertEqual(deleted, 1)
+        self.assertIsNone(await aversion_is_locked(self.version))
+        self.assertIsNone(await aget_lock_for_content(self.version.content))
+
+        lock = await acreate_version_lock(self.version, self.other_user)
+
+        self.assertEqual(lock.created_by, self.other_user)
+        self.assertEqual(await acreate_version_lock(self.version, self.user), lock)
+        self.assertEqual(await VersionLock.objects.filter(version=self.version).acount(), 1)
+
+    @patch('djangocms_version_locking.helpers.emit_content_change', None)
+    @patch('djangocms_version_locking.helpers._sync_lock_changed')
+    async def test_lock_changes_stay_on_the_event_loop_without_commit_callbacks(self, mocked_lock_changed):
+        await aget_lock_for_content(self.version.content)
+        await aremove_version_lock(self.version)
+
+        self.assertIsNone(await aget_lock_for_content(self.version.content))
+
+        await acreate_version_lock(self.version, self.other_user)
+
+        self.assertEqual((await aget_lock_for_content(self.version.content)).created_by, self.other_user)
+        mocked_lock_changed.assert_not_called()
+
+    async def test_unlock_view(self):
+        version = self.other_version
+        request = AsyncRequestFactory().post('/unlock/')
+        request.user = self.user
+
+        response = await unlock_version(request, version.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {'locked': False, 'version': version.pk})
+        self.assertFalse(await VersionLock.objects.filter(version=version).aexists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.other_user.email])
+
+    async def test_unlock_view_only_unlocks_drafts(self):
+        request = AsyncRequestFactory().post('/unlock/')
+        request.user = self.user
+
+        with self.assertRaises(Http404):
+            await unlock_version(request, self.published_version.pk)
+
+    async def test_unlock_view_requires_the_unlock_permission(self):
+        request = AsyncRequestFactory().post('/unlock/')
+        request.user = self.other_user
+
+        response = await unlock_version(request, self.version.pk)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(await VersionLock.objects.filter(version=self.version).aexists())
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'locks': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'locks'},
+})
+@patch('djangocms_version_locking.cache.VERSION_LOCKING_CACHE_ALIAS', 'locks')
+class AsyncLockHelpersWithSharedCacheAndEventsTestCase(CMSTestCase):
+    """The sync tests drive the async helpers with async_to_sync, so that the
+    on commit callbacks registered by the helpers can be captured
+    """
+
+    def setUp(self):
+        caches['locks'].clear()
+        self.broker = Mock()
+        patcher = patch('djangocms_version_locking.events.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = self.get_superuser()
+        self.other_user = factories.UserFactory(is_staff=True)
+        self.version = factories.PollVersionFactory(created_by=self.other_user)
+
+    def _get_published_statuses(self):
+        return [call.args[1]['locked'] for call in self.broker.publish.call_args_list]
+
+    def test_lock_changes_are_cached_and_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            async_to_sync(aremove_version_lock)(self.version)
+
+        self.assertIsNone(async_to_sync(aget_lock_for_content)(self.version.content))
+        self.assertIsNone(async_to_sync(aversion_is_locked)(Version.objects.get(pk=self.version.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lock = async_to_sync(acreate_version_lock)(self.version, self.user)
+
+        # Read back from the shared cache
+        async_to_sync(aget_lock_for_content)(self.version.content)
+        with self.assertNumQueries(0):
+            self.assertEqual(async_to_sync(aget_lock_for_content)(self.version.content), lock)
+        self.assertEqual(self._get_published_statuses(), [False, True])
+
+    def test_unlock_view(self):
+        request = AsyncRequestFactory().post('/unlock/')
+        request.user = self.user
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = async_to_sync(unlock_version)(request, self.version.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(VersionLock.objects.filter(version=self.version).exists())
+        self.assertEqual(self._get_published_statuses(), [False])
+        self.assertEqual(len(mail.outbox), 1)
+
+    @patch('djangocms_version_locking.emails.EMAIL_NOTIFICATIONS_USE_OUTBOX', True)
+    @patch('djangocms_version_locking.emails.notify_version_author_version_unlocked', side_effect=DatabaseError)
+    def test_unlock_view_rolls_back_the_unlock_when_queuing_the_notification_fails(self, mocked_notify):
+        request = AsyncRequestFactory().post('/unlock/')
+        request.user = self.user
+
+        with self.assertRaises(DatabaseError):
+            async_to_sync(unlock_version)(request, self.version.pk)
+
+        self.assertTrue(VersionLock.objects.filter(version=self.version).exists())
@@ -0,0 +1,128 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib import admin
+
+from cms.test_utils.testcases import CMSTestCase
+
+from djangocms_versioning import constants
+from djangocms_versioning.helpers import version_list_url
+from djangocms_versioning.models import Version
+from djangocms_versioning.test_utils.factories import PageVersionFactory
+
+from djangocms_version_locking.helpers import (
+    placeholder_content_is_unlocked_for_user,
+)
+from djangocms_version_locking.test_utils import factories
+from djangocms_version_locking.test_utils.benchmarks import (
+    BENCHMARKS_ENV,
+    benchmarks_enabled,
+    create_locked_poll_versions,
+    get_benchmark_sizes,
+    measure,
+    write_results,
+)
+from djangocms_version_locking.test_utils.polls.cms_config import (
+    PollsCMSConfig,
+)
+from djangocms_version_locking.test_utils.test_helpers import get_toolbar
+
+
+@skipUnless(benchmarks_enabled(), "Set {}=1 to run the benchmarks".format(BENCHMARKS_ENV))
+class LockingBenchmarkTestCase(CMSTestCase):
+    """Times the locking hot paths against databases of growing sizes,
+    the results are written as JSON once all the sizes have run
+    """
+    results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.results:
+            write_results(cls.results)
+
+    def setUp(self):
+        self.superuser = self.get_superuser()
+        self.other_user = factories.UserFactory(is_staff=True, is_superuser=True)
+        self.versionable = PollsCMSConfig.versioning[0]
+
+    def test_locking_hot_paths(self):
+        created = 0
+        for size in get_benchmark_sizes():
+            create_locked_poll_versions(size - created, self.superuser)
+            created = size
+            self.results.extend([
+                self._benchmark_toolbar(size),
+                self._benchmark_changelist(size),
+                self._benchmark_placeholder_check(size),
+                self._benchmark_draft_save(size),
+                self._benchmark_publish(size),
+                self._benchmark_unlock_view(size),
+                self._benchmark_moderation_collection(size),
+            ])
+
+    def _benchmark_toolbar(self, size):
+        version = PageVersionFactory(created_by=self.superuser)
+
+        return measure(
+            'toolbar', size,
+            lambda: get_toolbar(version.content, self.other_user, content_mode=True),
+        )
+
+    def _benchmark_changelist(self, size):
+        draft_version = factories.PollVersionFactory(created_by=self.superuser)
+        archived_versions = factories.PollVersionFactory.create_batch(
+            min(size, 1000), content__poll=draft_version.content.poll, state=constants.ARCHIVED,
+        )
+        changelist_url = version_list_url(draft_version.content)
+        version_admin = admin.site._registry[self.versionable.version_model_proxy]
+
+        # Render every version of the grouping, up to 1,001 rows, on one page
+        with patch.object(version_admin, 'list_per_page', len(archived_versions) + 1):
+            with self.login_user_context(self.superuser):
+                return measure('changelist', size, lambda: self.client.get(changelist_url))
+
+    def _benchmark_placeholder_check(self, size):
+        version = PageVersionFactory(created_by=self.superuser)
+        placeholder = factories.PlaceholderFactory(source=version.content)
+
+        return measure(
+            'placeholder_check', size,
+            lambda: placeholder_content_is_unlocked_for_user(placeholder, self.other_user),
+        )
+
+    def _benchmark_draft_save(self, size):
+        return measure(
+            'draft_save', size,
+            lambda content: Version.objects.create(content=content, created_by=self.superuser, state=constants.DRAFT),
+            setup=factories.PollContentFactory,
+        )
+
+    def _benchmark_publish(self, size):
+        return measure(
+            'publish', size,
+            lambda version: version.publish(self.superuser),
+            setup=lambda: Version.objects.get(pk=factories.PollVersionFactory(created_by=self.superuser).pk),
+        )
+
+    def _benchmark_unlock_view(self, size):
+        def get_unlock_url():
+            version = factories.PollVersionFactory(created_by=self.other_user)
+            return self.get_admin_url(self.versionable.version_model_proxy, 'unlock', version.pk)
+
+        with self.login_user_context(self.superuser):
+            return measure('unlock_view', size, self.client.post, setup=get_unlock_url)
+
+    def _benchmark_moderation_collection(self, size):
+        def get_collection():
+            version = PageVersionFactory(created_by=self.superuser)
+            placeholder = factories.PlaceholderFactory(source=version.content)
+            for poll_version in factories.PollVersionFactory.create_batch(10, created_by=self.other_user):
+                factories.PollPluginFactory(placeholder=placeholder, poll=poll_version.content.poll)
+            return factories.ModerationCollectionFactory(author=self.superuser), version
+
+        return measure(
+            'moderation_collection', size,
+            lambda args: args[0].add_version(args[1], include_children=True),
+            setup=get_collection,
+        )
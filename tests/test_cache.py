@@ -0,0 +1,186 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.core.signals import request_finished, request_started
+from django.db.models import Model
+from django.test import override_settings
+
+from cms.test_utils.testcases import CMSTestCase
+
+from djangocms_versioning.models import Version
+from djangocms_versioning.test_utils.factories import PageVersionFactory
+
+from djangocms_version_locking.cache import (
+    connect_lock_signals,
+    disconnect_lock_signals,
+)
+from djangocms_version_locking.conf import VERSION_LOCKING_CACHE_TIMEOUT
+from djangocms_version_locking.helpers import (
+    create_version_lock,
+    get_lock_for_content,
+    remove_version_lock,
+    remove_version_locks,
+    version_is_locked,
+)
+from djangocms_version_locking.models import VersionLock
+
+
+class RequestLockCacheTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user = self.get_superuser()
+        self.version = PageVersionFactory(created_by=self.user)
+        self.content = self.version.content
+
+    def tearDown(self):
+        request_finished.send(sender=self.__class__)
+
+    def test_lock_is_not_cached_outside_of_a_request(self):
+        get_lock_for_content(self.content)
+
+        with self.assertNumQueries(1):
+            get_lock_for_content(self.content)
+
+    def test_lock_is_resolved_once_per_request(self):
+        request_started.send(sender=self.__class__)
+
+        lock = get_lock_for_content(self.content)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_lock_for_content(self.content), lock)
+
+    def test_cache_is_cleared_when_the_request_finishes(self):
+        request_started.send(sender=self.__class__)
+        get_lock_for_content(self.content)
+        request_finished.send(sender=self.__class__)
+
+        with self.assertNumQueries(1):
+            get_lock_for_content(self.content)
+
+    def test_locks_are_deleted_without_being_loaded(self):
+        # No signal receivers are connected without the shared cache
+        with self.assertNumQueries(1):
+            VersionLock.objects.filter(version=self.version).delete()
+
+    def test_remove_and_create_lock_invalidate_the_cache(self):
+        request_started.send(sender=self.__class__)
+        self.assertIsNotNone(get_lock_for_content(self.content))
+
+        remove_version_lock(self.version)
+
+        self.assertIsNone(get_lock_for_content(self.content))
+
+        create_version_lock(self.version, self.user)
+
+        self.assertEqual(get_lock_for_content(self.content).created_by, self.user)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'locks': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'locks'},
+})
+@patch('djangocms_version_locking.cache.VERSION_LOCKING_CACHE_ALIAS', 'locks')
+class SharedLockCacheTestCase(CMSTestCase):
+
+    def setUp(self):
+        caches['locks'].clear()
+        connect_lock_signals()
+        self.addCleanup(disconnect_lock_signals)
+        self.user = self.get_superuser()
+        self.other_user = self.get_staff_user_with_no_permissions()
+        self.version = PageVersionFactory(created_by=self.user)
+        self.content = self.version.content
+
+    def get_version(self):
+        # A fresh instance, as another process would load it
+        return Version.objects.get(pk=self.version.pk)
+
+    def assertCacheMatchesDatabase(self):
+        expected = VersionLock.objects.filter(version=self.version).values_list('pk', 'created_by_id').first()
+        # Warm the cache, then read from it
+        for _ in range(2):
+            for lock in [get_lock_for_content(self.content), version_is_locked(self.get_version())]:
+                self.assertEqual(lock and (lock.pk, lock.created_by_id), expected)
+
+    def test_lock_lookups_are_shared_between_processes(self):
+        lock = get_lock_for_content(self.content)
+        version_is_locked(self.get_version())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_lock_for_content(self.content), lock)
+            self.assertEqual(get_lock_for_content(self.content).created_by, self.user)
+        version = self.get_version()
+        with self.assertNumQueries(0):
+            self.assertEqual(version_is_locked(version), lock)
+
+    def test_cached_locks_only_hold_plain_values(self):
+        lock = version_is_locked(self.get_version())
+        entry = caches['locks'].get('djangocms_version_locking:v2:version:{}'.format(self.version.pk))
+
+        def flatten(value):
+            if isinstance(value, tuple):
+                for item in value:
+                    yield from flatten(item)
+            else:
+                yield value
+
+        # The lock was found and packed, not cached as unlocked
+        self.assertIsNotNone(entry[0])
+        self.assertIn(lock.pk, list(flatten(entry)))
+        self.assertIn(self.user.get_username(), list(flatten(entry)))
+        self.assertFalse([value for value in flatten(entry) if isinstance(value, Model)])
+        self.assertNotIn(self.user.password, list(flatten(entry)))
+        version = self.get_version()
+        with self.assertNumQueries(0):
+            lock = version_is_locked(version)
+            self.assertEqual(lock.version_id, self.version.pk)
+            self.assertEqual(lock.created_by.get_username(), self.user.get_username())
+            self.assertEqual(lock.created_by.get_full_name(), self.user.get_full_name())
+
+    def test_unlocked_lookups_are_cached(self):
+        remove_version_lock(self.version)
+        get_lock_for_content(self.content)
+        version_is_locked(self.get_version())
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_lock_for_content(self.content))
+        version = self.get_version()
+        with self.assertNumQueries(0):
+            self.assertIsNone(version_is_locked(version))
+
+    def test_cache_matches_database_after_every_mutation(self):
+        self.assertCacheMatchesDatabase()
+
+        remove_version_lock(self.version)
+        self.assertCacheMatchesDatabase()
+
+        create_version_lock(self.version, self.other_user)
+        self.assertCacheMatchesDatabase()
+        self.assertEqual(get_lock_for_content(self.content).created_by, self.other_user)
+
+        remove_version_locks([self.version])
+        self.assertCacheMatchesDatabase()
+
+        VersionLock.objects.create(version=self.version, created_by=self.user)
+        self.assertCacheMatchesDatabase()
+
+        lock = VersionLock.objects.get(version=self.version)
+        lock.created_by = self.other_user
+        lock.save()
+        self.assertCacheMatchesDatabase()
+
+        lock.delete()
+        self.assertCacheMatchesDatabase()
+
+    def test_stale_reads_are_bounded_by_the_timeout(self):
+        lock = get_lock_for_content(self.content)
+        # Bypasses the helpers and the model signals
+        VersionLock.objects.filter(pk=lock.pk).update(created_by=self.other_user)
+
+        self.assertEqual(get_lock_for_content(self.content).created_by, self.user)
+
+        expired = time.time() + VERSION_LOCKING_CACHE_TIMEOUT + 1
+        with patch('django.core.cache.backends.locmem.time') as mocked_time:
+            mocked_time.time.return_value = expired
+            self.assertEqual(get_lock_for_content(self.content).created_by, self.other_user)
@@ -1,5 +1,11 @@
+from smtplib import SMTPException
+from unittest.mock import patch
+
 from django.contrib.auth.models import Permission
+from django.contrib.sites.models import Site
 from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.translation import gettext_lazy as _
 
 from cms.test_utils.testcases import CMSTestCase
@@ -9,7 +15,15 @@ from cms.utils import get_current_site
 from djangocms_versioning.cms_config import VersioningCMSConfig
 from djangocms_versioning.test_utils import factories
 
-from djangocms_version_locking.utils import get_absolute_url
+from djangocms_version_locking.emails import (
+    notify_version_authors_versions_unlocked,
+)
+from djangocms_version_locking.models import VersionLock
+from djangocms_version_locking.utils import (
+    clear_site_cache,
+    get_absolute_url,
+    get_site_context,
+)
 
 
 class VersionLockNotificationEmailsTestCase(CMSTestCase):
@@ -127,3 +141,53 @@ class VersionLockNotificationEmailsTestCase(CMSTestCase):
 
         self.assertEqual(len(mail.outbox), 1)
         self.assertTrue(expected_body in mail.outbox[0].body)
+
+    @patch('djangocms_version_locking.emails.send_email', side_effect=SMTPException)
+    def test_mail_error_does_not_undo_the_unlock(self, mocked_send_email):
+        draft_version = factories.PageVersionFactory(content__template="", created_by=self.user_author)
+        draft_unlock_url = self.get_admin_url(self.versionable.version_model_proxy, 'unlock', draft_version.pk)
+
+        with self.login_user_context(self.user_has_unlock_perms), self.assertRaises(SMTPException):
+            self.client.post(draft_unlock_url)
+
+        mocked_send_email.assert_called_once()
+        self.assertFalse(VersionLock.objects.filter(version=draft_version).exists())
+
+
+class SiteContextTestCase(CMSTestCase):
+
+    def tearDown(self):
+        clear_site_cache()
+
+    def test_current_site_context_is_computed_once(self):
+        get_site_context()
+        Site.objects.clear_cache()
+
+        with self.assertNumQueries(0):
+            site_context = get_site_context()
+
+        site = Site.objects.get_current()
+        self.assertEqual(site_context.name, site.name)
+        self.assertEqual(site_context.base_url, "http://{}".format(site.domain))
+
+    def test_site_context_is_invalidated_when_the_site_changes(self):
+        get_site_context()
+        site = Site.objects.get_current()
+        site.name = "Renamed site"
+        site.domain = "renamed.example.com"
+        site.save()
+
+        self.assertEqual(get_site_context().name, "Renamed site")
+        self.assertEqual(get_absolute_url("/en/"), "http://renamed.example.com/en/")
+
+    def test_batch_notifications_do_not_query_the_site_table(self):
+        unlocking_user = self._create_user("unlocking_user", is_staff=True, is_superuser=False)
+        versions = [factories.PageVersionFactory(content__template="") for _ in range(3)]
+        get_site_context()
+        Site.objects.clear_cache()
+
+        with CaptureQueriesContext(connection) as queries:
+            notify_version_authors_versions_unlocked(versions, unlocking_user)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse([query for query in queries.captured_queries if 'django_site' in query['sql']])
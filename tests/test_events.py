@@ -0,0 +1,136 @@
+import asyncio
+import threading
+from unittest.mock import Mock, patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import AsyncRequestFactory
+
+from cms.test_utils.testcases import CMSTestCase
+
+from asgiref.sync import async_to_sync
+
+from djangocms_version_locking.events import InMemoryBroker, get_channel
+from djangocms_version_locking.helpers import (
+    create_version_lock,
+    remove_version_lock,
+)
+from djangocms_version_locking.test_utils import factories
+from djangocms_version_locking.views import lock_events
+
+
+class InMemoryBrokerTestCase(CMSTestCase):
+
+    def test_events_are_delivered_to_the_subscribers_of_their_channel(self):
+        broker = InMemoryBroker()
+
+        async def receive():
+            subscription = broker.subscribe(['1:2'])
+            publisher = threading.Thread(target=broker.publish, args=('1:2', {'locked': True}))
+            publisher.start()
+            publisher.join()
+            broker.publish('1:3', {'locked': False})
+            event = await subscription.get(timeout=1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await subscription.get(timeout=0.01)
+            subscription.close()
+            return event
+
+        self.assertEqual(async_to_sync(receive)(), {'locked': True})
+        self.assertFalse(broker._subscriptions)
+
+
+class LockEventPublishingTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user = self.get_superuser()
+        self.version = factories.PollVersionFactory(created_by=self.user)
+        self.channel = get_channel(self.version.content_type_id, self.version.object_id)
+
+    @patch('djangocms_version_locking.events.get_broker')
+    def test_lock_changes_are_published_on_commit(self, get_broker):
+        broker = get_broker.return_value = Mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_version_lock(self.version)
+            create_version_lock(self.version, self.user)
+
+            broker.publish.assert_not_called()
+
+        unlocked, locked = [call.args for call in broker.publish.call_args_list]
+        self.assertEqual(unlocked, (
+            self.channel,
+            {'locked': False, 'version': self.version.pk, 'content': self.channel},
+        ))
+        self.assertEqual(locked[0], self.channel)
+        self.assertTrue(locked[1]['locked'])
+        self.assertEqual(locked[1]['owner']['id'], self.user.pk)
+
+
+class LockEventsViewTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.broker = InMemoryBroker()
+        patcher = patch('djangocms_version_locking.views.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        version = factories.PollVersionFactory()
+        self.channel = get_channel(version.content_type_id, version.object_id)
+
+    def _get_request(self, user, content=None):
+        request = AsyncRequestFactory().get('/lock-events/', {'content': content or self.channel})
+        request.user = user
+        return request
+
+    def test_users_who_are_not_staff_are_forbidden(self):
+        request = self._get_request(factories.UserFactory(is_staff=False))
+
+        self.assertEqual(async_to_sync(lock_events)(request).status_code, 403)
+
+    def test_staff_without_view_permission_on_the_versions_is_forbidden(self):
+        request = self._get_request(self.get_staff_user_with_no_permissions())
+
+        self.assertEqual(async_to_sync(lock_events)(request).status_code, 403)
+
+    def test_channels_of_content_types_without_versions_are_forbidden(self):
+        request = self._get_request(self.get_superuser(), content='{}:1'.format(
+            ContentType.objects.get_for_model(ContentType).pk,
+        ))
+
+        self.assertEqual(async_to_sync(lock_events)(request).status_code, 403)
+
+    def test_invalid_channels_are_rejected(self):
+        request = self._get_request(self.get_superuser(), content='page')
+
+        self.assertEqual(async_to_sync(lock_events)(request).status_code, 400)
+
+    def test_lock_events_are_streamed(self):
+        request = self._get_request(self.get_superuser())
+
+        async def stream():
+            response = await lock_events(request)
+            chunks = response.streaming_content
+            received = [await chunks.__anext__()]
+            self.broker.publish(self.channel, {'locked': False})
+            received.append(await chunks.__anext__())
+            await chunks.aclose()
+            return response, received
+
+        response, received = async_to_sync(stream)()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(received, [b': subscribed\n\n', b'event: lock\ndata: {"locked": false}\n\n'])
+
+    @patch('djangocms_version_locking.views.VERSION_LOCKING_EVENT_KEEPALIVE', 0.01)
+    @patch('djangocms_version_locking.views.VERSION_LOCKING_EVENT_STREAM_TIMEOUT', 0.05)
+    def test_streams_end_after_the_timeout(self):
+        request = self._get_request(self.get_superuser())
+
+        async def stream():
+            response = await lock_events(request)
+            return [chunk async for chunk in response.streaming_content]
+
+        received = async_to_sync(stream)()
+
+        self.assertEqual(received[0], b': subscribed\n\n')
+        self.assertEqual(set(received[1:]), {b': keepalive\n\n'})
+        self.assertFalse(self.broker._subscriptions)
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from cms.test_utils.testcases import CMSTestCase
+
+from djangocms_version_locking.expiry import release_expired_locks
+from djangocms_version_locking.models import VersionLock
+from djangocms_version_locking.test_utils import factories
+
+
+class LockExpiryTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.owner = factories.UserFactory(email="owner@example.com")
+        self.expired_versions = factories.PollVersionFactory.create_batch(2, created_by=self.owner)
+        self.fresh_version = factories.PollVersionFactory(created_by=self.owner)
+        VersionLock.objects.filter(version__in=self.expired_versions).update(
+            created=timezone.now() - timedelta(seconds=3601),
+        )
+
+    def test_expired_locks_are_released_and_fresh_locks_kept(self):
+        released = release_expired_locks(ttl=3600)
+
+        self.assertEqual(released, 2)
+        self.assertEqual(list(VersionLock.objects.values_list('version', flat=True)), [self.fresh_version.pk])
+
+    def test_owners_get_a_single_email_per_sweep(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            release_expired_locks(ttl=3600)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.owner.email])
+        self.assertIn("The locks of the following 2 draft versions have expired", mail.outbox[0].body)
+        for version in self.expired_versions:
+            self.assertIn(str(version.content), mail.outbox[0].body)
+
+    def test_owners_are_only_emailed_once_the_release_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            release_expired_locks(ttl=3600)
+
+            self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(mail.outbox, [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_expired_locks_are_released_in_chunks(self):
+        self.assertEqual(release_expired_locks(ttl=3600, batch_size=1), 1)
+        self.assertEqual(VersionLock.objects.count(), 2)
+
+        call_command('release_expired_locks', ttl=3600, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(VersionLock.objects.count(), 1)
+
+    def test_command_requires_a_ttl(self):
+        with self.assertRaises(CommandError):
+            call_command('release_expired_locks', stdout=StringIO())
@@ -0,0 +1,112 @@
+from unittest.mock import Mock, patch
+
+from django.db import transaction
+
+from cms.test_utils.testcases import CMSTestCase
+
+from djangocms_versioning.constants import ARCHIVED
+from djangocms_versioning.test_utils.factories import (
+    FancyPollFactory,
+    PageVersionFactory,
+)
+
+from djangocms_version_locking.helpers import (
+    content_is_unlocked_for_user,
+    create_version_lock,
+    get_locks_for_contents,
+    prefetch_locks,
+    remove_version_lock,
+    remove_version_locks,
+)
+from djangocms_version_locking.test_utils import factories
+
+
+class BulkLockLookupTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user = self.get_superuser()
+        self.page_versions = [PageVersionFactory(created_by=self.user) for _ in range(3)]
+        self.archived_page_version = PageVersionFactory(state=ARCHIVED)
+        self.poll_versions = factories.PollVersionFactory.create_batch(2, created_by=self.user)
+        self.unversioned = FancyPollFactory()
+
+    def get_contents(self):
+        return [
+            version.content
+            for version in self.page_versions + [self.archived_page_version] + self.poll_versions
+        ] + [self.unversioned]
+
+    def test_get_locks_for_contents_uses_one_query_per_content_type(self):
+        contents = self.get_contents()
+
+        with self.assertNumQueries(2):
+            locks = get_locks_for_contents(contents)
+
+        for version in self.page_versions + self.poll_versions:
+            self.assertEqual(locks[version.content], version.versionlock)
+        self.assertIsNone(locks[self.archived_page_version.content])
+        self.assertIsNone(locks[self.unversioned])
+
+    def test_locks_are_fetched_with_their_owner(self):
+        locks = get_locks_for_contents(self.get_contents())
+
+        with self.assertNumQueries(0):
+            owners = {lock.created_by for lock in locks.values() if lock}
+
+        self.assertEqual(owners, {self.user})
+
+    def test_prefetch_locks_avoids_further_queries(self):
+        other_user = factories.UserFactory()
+        contents = prefetch_locks(self.get_contents())
+
+        with self.assertNumQueries(0):
+            unlocked = [content_is_unlocked_for_user(content, other_user) for content in contents]
+
+        self.assertEqual(unlocked, [False, False, False, True, False, False, True])
+
+
+@patch('djangocms_version_locking.helpers.emit_content_change', new_callable=Mock)
+class ContentChangeOnCommitTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user = self.get_superuser()
+        self.versions = factories.PollVersionFactory.create_batch(2, created_by=self.user)
+
+    def test_content_changes_are_emitted_once_per_content_on_commit(self, emit_content_change):
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_version_lock(self.versions[0])
+            create_version_lock(self.versions[0], self.user)
+            remove_version_locks(self.versions)
+
+            emit_content_change.assert_not_called()
+
+        self.assertEqual(
+            sorted(call.args[0].pk for call in emit_content_change.call_args_list),
+            sorted(version.content.pk for version in self.versions),
+        )
+
+    def test_content_changes_are_not_emitted_when_rolled_back(self, emit_content_change):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    remove_version_lock(self.versions[0])
+                    raise ValueError
+            except ValueError:
+                pass
+            remove_version_lock(self.versions[1])
+
+        emit_content_change.assert_called_once_with(self.versions[1].content)
+
+    def test_content_changes_of_a_savepoint_are_emitted_once_with_the_transaction(self, emit_content_change):
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_version_lock(self.versions[0])
+            with transaction.atomic():
+                create_version_lock(self.versions[0], self.user)
+                remove_version_lock(self.versions[1])
+
+            emit_content_change.assert_not_called()
+
+        self.assertEqual(
+            sorted(call.args[0].pk for call in emit_content_change.call_args_list),
+            sorted(version.content.pk for version in self.versions),
+        )
@@ -1,9 +1,28 @@
-from cms.test_utils.testcases import CMSTestCase
+from importlib import import_module
+from types import SimpleNamespace
+from unittest.mock import DEFAULT, patch
+
+from django.apps import apps
+from django.db import connection, models
+from django.test.utils import CaptureQueriesContext
+
+from cms.test_utils.testcases import CMSTestCase, TransactionCMSTestCase
 
 from djangocms_versioning import constants
 from djangocms_versioning.models import Version
 
-from djangocms_version_locking.helpers import version_is_locked
+from djangocms_version_locking.helpers import (
+    batch_draft_lock_removals,
+    create_version_lock,
+    get_draft_lock_owner,
+    get_grouping_key,
+    get_lock_for_content,
+    remove_version_lock,
+    remove_version_locks,
+    version_is_locked,
+)
+from djangocms_version_locking.models import DraftLockOwner, VersionLock
+from djangocms_version_locking.monkeypatch.models import new_save
 from djangocms_version_locking.test_utils import factories
 from djangocms_version_locking.test_utils.polls.cms_config import (
     PollsCMSConfig,
@@ -73,6 +92,183 @@ class TestVersionsLockTestCase(CMSTestCase):
         # Version lock does not exist
         self.assertFalse(hasattr(updated_poll_version, 'versionlock'))
 
+    def _get_lock_queries(self, queries):
+        table = VersionLock._meta.db_table
+        return [query['sql'] for query in queries.captured_queries if table in query['sql']]
+
+    def test_draft_creation_inserts_its_lock_without_looking_it_up(self):
+        """
+        Creating a draft inserts its lock without looking it up first,
+        and the lock is cached on the version
+        """
+        user = factories.UserFactory()
+        content = factories.PollContentFactory()
+
+        with CaptureQueriesContext(connection) as queries:
+            draft_version = Version.objects.create(content=content, created_by=user, state=constants.DRAFT)
+
+        lock_queries = self._get_lock_queries(queries)
+        self.assertEqual(len(lock_queries), 1)
+        self.assertTrue(lock_queries[0].startswith('INSERT'))
+        with self.assertNumQueries(0):
+            self.assertEqual(draft_version.versionlock.created_by, user)
+
+    def test_lock_creation_statements(self):
+        """
+        Inside a transaction the insert is wrapped in a savepoint
+        """
+        draft_version = factories.PollVersionFactory(state=constants.DRAFT)
+        remove_version_lock(draft_version)
+
+        with CaptureQueriesContext(connection) as queries:
+            create_version_lock(draft_version, factories.UserFactory())
+
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries.captured_queries],
+            ['SAVEPOINT', 'INSERT', 'RELEASE'],
+        )
+
+    def test_creating_an_existing_lock_returns_it(self):
+        draft_version = factories.PollVersionFactory(state=constants.DRAFT)
+        lock = draft_version.versionlock
+
+        self.assertEqual(create_version_lock(draft_version, factories.UserFactory()), lock)
+        self.assertEqual(VersionLock.objects.filter(version=draft_version).count(), 1)
+
+    def _get_lock_deletes(self, queries):
+        return [query for query in self._get_lock_queries(queries) if query.startswith('DELETE')]
+
+    def test_publish_only_deletes_the_lock_of_the_published_draft(self):
+        user = self.get_superuser()
+        published_version = factories.PollVersionFactory(state=constants.PUBLISHED)
+        draft_version = factories.PollVersionFactory(content__poll=published_version.content.poll)
+        draft_version = Version.objects.get(pk=draft_version.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            draft_version.publish(user)
+
+        # The previously published version is unpublished without touching locks
+        self.assertEqual(len(self._get_lock_deletes(queries)), 1)
+        self.assertFalse(VersionLock.objects.exists())
+
+    def test_archive_deletes_the_draft_lock(self):
+        draft_version = Version.objects.get(pk=factories.PollVersionFactory(state=constants.DRAFT).pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            draft_version.archive(self.get_superuser())
+
+        self.assertEqual(len(self._get_lock_deletes(queries)), 1)
+        self.assertFalse(VersionLock.objects.exists())
+
+    def test_unpublish_does_not_touch_locks(self):
+        published_version = Version.objects.get(pk=factories.PollVersionFactory(state=constants.PUBLISHED).pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            published_version.unpublish(self.get_superuser())
+
+        self.assertEqual(self._get_lock_queries(queries), [])
+
+    def test_saving_fields_unrelated_to_the_lock_does_not_touch_locks(self):
+        draft_version = Version.objects.get(pk=factories.PollVersionFactory(state=constants.DRAFT).pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            draft_version.save(update_fields=['modified'])
+
+        self.assertEqual(self._get_lock_queries(queries), [])
+
+    def test_saving_a_draft_again_does_not_touch_locks(self):
+        draft_version = Version.objects.get(pk=factories.PollVersionFactory(state=constants.DRAFT).pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            draft_version.save()
+
+        self.assertEqual(self._get_lock_queries(queries), [])
+        self.assertFalse(
+            [query for query in queries.captured_queries if DraftLockOwner._meta.db_table in query['sql']]
+        )
+
+    def test_saving_a_draft_with_a_new_author_locks_it(self):
+        user = factories.UserFactory()
+        draft_version = Version.objects.get(pk=factories.PollVersionFactory(state=constants.DRAFT).pk)
+        remove_version_lock(draft_version)
+
+        draft_version.created_by = user
+        draft_version.save()
+
+        self.assertEqual(VersionLock.objects.get(version=draft_version).created_by, user)
+
+    def _assert_operation_budget(self, make_version, operation, lock_statements):
+        """
+        `operation` takes the queries versioning needs, measured on another
+        version with the lock hook switched off, and `lock_statements` more
+        """
+        version = make_version()
+        with patch.multiple(
+            'djangocms_version_locking.monkeypatch.models',
+            create_version_lock=DEFAULT,
+            remove_draft_version_lock=DEFAULT,
+            set_draft_version=DEFAULT,
+        ):
+            with CaptureQueriesContext(connection) as versioning_queries:
+                operation(version)
+
+        version = make_version()
+        with self.assertNumQueries(len(versioning_queries) + lock_statements):
+            operation(version)
+
+    def _make_draft(self):
+        return Version.objects.get(pk=factories.PollVersionFactory(state=constants.DRAFT).pk)
+
+    def _make_draft_of_a_published_version(self):
+        published_version = factories.PollVersionFactory(state=constants.PUBLISHED)
+        draft_version = factories.PollVersionFactory(content__poll=published_version.content.poll)
+        return Version.objects.get(pk=draft_version.pk)
+
+    def _make_published_version(self):
+        return Version.objects.get(pk=factories.PollVersionFactory(state=constants.PUBLISHED).pk)
+
+    def test_publish_query_budget(self):
+        """
+        Deleting the lock of the published draft and clearing the draft of
+        its grouping, the unpublished version costs nothing
+        """
+        user = self.get_superuser()
+        self._assert_operation_budget(
+            self._make_draft_of_a_published_version, lambda version: version.publish(user), 2,
+        )
+
+    def test_archive_query_budget(self):
+        user = self.get_superuser()
+        self._assert_operation_budget(self._make_draft, lambda version: version.archive(user), 2)
+
+    def test_unpublish_query_budget(self):
+        user = self.get_superuser()
+        self._assert_operation_budget(self._make_published_version, lambda version: version.unpublish(user), 0)
+
+    def test_draft_save_query_budget(self):
+        self._assert_operation_budget(self._make_draft, lambda version: version.save(), 0)
+
+    def test_batched_lock_removals(self):
+        """
+        The locks of all the drafts leaving the draft state in the block are
+        deleted together and the drafts of their groupings cleared together
+        """
+        user = self.get_superuser()
+        draft_versions = [self._make_draft(), self._make_draft()]
+
+        with CaptureQueriesContext(connection) as queries:
+            with batch_draft_lock_removals():
+                for draft_version in draft_versions:
+                    draft_version.archive(user)
+
+        self.assertEqual(len(self._get_lock_deletes(queries)), 1)
+        self.assertEqual(
+            len([query for query in queries.captured_queries if DraftLockOwner._meta.db_table in query['sql']]),
+            1,
+        )
+        self.assertFalse(VersionLock.objects.exists())
+        self.assertFalse(DraftLockOwner.objects.filter(version__in=draft_versions).exists())
+
 
 class TestVersionCopyLocks(CMSTestCase):
 
@@ -109,3 +305,206 @@ class TestVersionCopyLocks(CMSTestCase):
         self.assertNotEqual(original_user, copy_user)
         self.assertEqual(original_version.versionlock.created_by, original_user)
         self.assertEqual(copied_version.versionlock.created_by, copy_user)
+
+
+class VersionQuerySetLockTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user = factories.UserFactory()
+        self.other_user = factories.UserFactory()
+        self.locked_version = factories.PollVersionFactory(created_by=self.user)
+        self.other_locked_version = factories.PollVersionFactory(created_by=self.other_user)
+        self.unlocked_version = factories.PollVersionFactory(state=constants.PUBLISHED)
+
+    def test_lock_filters(self):
+        self.assertEqual(
+            list(Version.objects.locked().order_by('pk')), [self.locked_version, self.other_locked_version],
+        )
+        self.assertEqual(list(Version.objects.unlocked()), [self.unlocked_version])
+        self.assertEqual(list(Version.objects.locked_by(self.user)), [self.locked_version])
+
+    def test_lock_filters_chain_with_other_filters(self):
+        queryset = Version.objects.filter(state=constants.DRAFT)
+
+        self.assertEqual(queryset.locked_by(self.other_user).get(), self.other_locked_version)
+        self.assertFalse(queryset.unlocked().exists())
+
+
+class VersionLockContentTestCase(CMSTestCase):
+
+    def test_lock_carries_the_content_of_its_version(self):
+        version = factories.PollVersionFactory(state=constants.DRAFT)
+        lock = VersionLock.objects.get(version=version)
+
+        self.assertEqual((lock.content_type_id, lock.object_id), (version.content_type_id, version.object_id))
+
+    def test_content_lock_lookup_does_not_join_the_versions(self):
+        version = factories.PollVersionFactory(state=constants.DRAFT)
+        get_lock_for_content(version.content)
+
+        with CaptureQueriesContext(connection) as queries:
+            lock = get_lock_for_content(version.content)
+
+        self.assertEqual(lock.version_id, version.pk)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(Version._meta.db_table, queries[0]['sql'])
+
+    def test_backfill_copies_the_content_of_the_versions(self):
+        versions = factories.PollVersionFactory.create_batch(3, state=constants.DRAFT)
+        VersionLock.objects.update(content_type=None, object_id=None)
+        migration = import_module('djangocms_version_locking.migrations.0006_backfill_versionlock_content')
+
+        with patch.object(migration, 'BATCH_SIZE', 2):
+            migration.backfill_lock_content(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(
+            set(VersionLock.objects.values_list('version_id', 'content_type_id', 'object_id')),
+            {(version.pk, version.content_type_id, version.object_id) for version in versions},
+        )
+
+
+class DraftCreationStatementsTestCase(TransactionCMSTestCase):
+    """
+    The statements of the save hook are asserted in full around a plain
+    model save, the bookkeeping of Version.save depends on the release of
+    djangocms-versioning
+    """
+
+    def setUp(self):
+        self.user = factories.UserFactory()
+        self.poll = factories.PollFactory()
+
+    def _create_draft(self):
+        content = factories.PollContentFactory(poll=self.poll, language='en')
+        version = Version(content=content, created_by=self.user, state=constants.DRAFT, number='1')
+        # The content type is looked up once per process
+        get_grouping_key(content)
+        save = new_save(models.Model.save)
+        with CaptureQueriesContext(connection) as queries:
+            save(version)
+        return version, [query['sql'] for query in queries.captured_queries]
+
+    def _get_statements(self, sqls):
+        """The kind and the model of the table of every statement"""
+        models_by_table = {model._meta.db_table: model for model in (Version, VersionLock, DraftLockOwner)}
+        statements = []
+        for sql in sqls:
+            words = sql.split()
+            # INSERT INTO <table> ... and UPDATE <table> ...
+            table = words[2] if words[0] == 'INSERT' else words[1]
+            statements.append((words[0], models_by_table.get(table.strip('"`'))))
+        return statements
+
+    def test_draft_of_a_new_grouping(self):
+        version, sqls = self._create_draft()
+
+        self.assertEqual(self._get_statements(sqls), [
+            ('INSERT', Version),
+            ('INSERT', VersionLock),
+            ('UPDATE', DraftLockOwner),
+            ('INSERT', DraftLockOwner),
+        ])
+        self.assertEqual(DraftLockOwner.objects.get().version, version)
+
+    def test_draft_of_a_recorded_grouping(self):
+        self._create_draft()
+
+        version, sqls = self._create_draft()
+
+        self.assertEqual(self._get_statements(sqls), [
+            ('INSERT', Version),
+            ('INSERT', VersionLock),
+            ('UPDATE', DraftLockOwner),
+        ])
+        self.assertEqual(DraftLockOwner.objects.get().version, version)
+        with self.assertNumQueries(0):
+            self.assertEqual(version.versionlock.created_by, self.user)
+
+
+class DraftLockOwnerTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user = self.get_superuser()
+        self.other_user = factories.UserFactory()
+        self.archived_version = factories.PollVersionFactory(state=constants.ARCHIVED)
+        self.draft_version = factories.PollVersionFactory(
+            content__poll=self.archived_version.content.poll, created_by=self.user,
+        )
+
+    def get_draft_lock_owner(self):
+        # A fresh instance, as the revert, unpublish and edit redirect checks get it
+        version = Version.objects.get(pk=self.archived_version.pk)
+        # The checks are run against the content being reverted or edited
+        self.assertIsNotNone(version.content)
+        with self.assertNumQueries(1):
+            return get_draft_lock_owner(version)
+
+    def test_draft_lock_owner_is_read_with_a_single_query(self):
+        self.assertEqual(self.get_draft_lock_owner(), self.user)
+
+        factories.PollVersionFactory.create_batch(
+            10, content__poll=self.archived_version.content.poll, state=constants.ARCHIVED,
+        )
+
+        self.assertEqual(self.get_draft_lock_owner(), self.user)
+
+    def test_draft_lock_owner_follows_the_lock(self):
+        remove_version_lock(self.draft_version)
+        self.assertIsNone(self.get_draft_lock_owner())
+
+        create_version_lock(self.draft_version, self.other_user)
+        self.assertEqual(self.get_draft_lock_owner(), self.other_user)
+
+        remove_version_locks([self.draft_version])
+        self.assertIsNone(self.get_draft_lock_owner())
+
+    def test_draft_lock_owner_is_cleared_when_the_draft_is_published(self):
+        self.draft_version.publish(self.user)
+
+        self.assertIsNone(self.get_draft_lock_owner())
+        self.assertTrue(
+            Version.objects.get(pk=self.archived_version.pk).check_revert.as_bool(self.other_user)
+        )
+
+    def _get_draft_lock_owner_statements(self):
+        version = Version.objects.get(pk=self.archived_version.pk)
+        self.assertIsNotNone(version.content)
+        with CaptureQueriesContext(connection) as queries:
+            owner = get_draft_lock_owner(version)
+        return owner, [query['sql'].split()[0] for query in queries.captured_queries]
+
+    def test_missing_draft_is_looked_up_without_being_recorded(self):
+        DraftLockOwner.objects.all().delete()
+
+        owner, statements = self._get_draft_lock_owner_statements()
+
+        self.assertEqual(owner, self.user)
+        # The record, the draft and its lock are read, nothing is written
+        self.assertEqual(statements, ['SELECT', 'SELECT', 'SELECT'])
+        self.assertFalse(DraftLockOwner.objects.exists())
+
+    def test_new_draft_is_recorded(self):
+        self.draft_version.publish(self.user)
+        new_draft_version = factories.PollVersionFactory(
+            content__poll=self.archived_version.content.poll, created_by=self.other_user,
+        )
+
+        self.assertEqual(
+            DraftLockOwner.objects.get(pk=get_grouping_key(self.archived_version.content)).version,
+            new_draft_version,
+        )
+        self.assertEqual(self.get_draft_lock_owner(), self.other_user)
+
+    def test_stale_draft_is_looked_up_without_being_recorded(self):
+        """
+        A draft whose state was changed bypassing Version.save is still
+        recorded as the draft of its grouping
+        """
+        key = get_grouping_key(self.archived_version.content)
+        DraftLockOwner.objects.filter(pk=key).update(version=self.archived_version)
+
+        owner, statements = self._get_draft_lock_owner_statements()
+
+        self.assertEqual(owner, self.user)
+        self.assertEqual(statements, ['SELECT', 'SELECT', 'SELECT'])
+        self.assertEqual(DraftLockOwner.objects.get(pk=key).version, self.archived_version)
@@ -1,3 +1,6 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from cms.test_utils.testcases import CMSTestCase
 from cms.utils.urlutils import add_url_parameters
 
@@ -9,6 +12,7 @@ from djangocms_version_locking.helpers import (
     remove_version_lock,
     version_is_locked,
 )
+from djangocms_version_locking.models import VersionLock
 from djangocms_version_locking.test_utils.factories import (
     ModerationCollectionFactory,
     PlaceholderFactory,
@@ -100,3 +104,27 @@ class ModerationCollectionTestCase(CMSTestCase):
         self.assertEqual(moderation_requests.count(), 2)
         self.assertTrue(moderation_requests.filter(version=self.page_version).exists())
         self.assertTrue(moderation_requests.filter(version=self.poll_version).exists())
+
+    def test_locks_of_nested_children_are_resolved_with_one_query(self):
+        """
+        The locks of all the children found on a level are resolved at once
+        """
+        unlocked_versions = PollVersionFactory.create_batch(3, content__language=self.language)
+        for poll_version in unlocked_versions:
+            remove_version_lock(poll_version)
+        for poll_version in [self.poll_version] + unlocked_versions:
+            PollPluginFactory(placeholder=self.placeholder, poll=poll_version.content.poll)
+        # The same child reached twice is only expanded once
+        PollPluginFactory(placeholder=self.placeholder, poll=self.poll_version.content.poll)
+        lock_table = VersionLock._meta.db_table
+
+        with CaptureQueriesContext(connection) as queries:
+            self.collection.add_version(self.page_version, include_children=True)
+
+        lock_queries = [query['sql'] for query in queries.captured_queries if lock_table in query['sql']]
+        self.assertEqual(len(lock_queries), 1)
+        moderation_requests = ModerationRequest.objects.filter(collection=self.collection)
+        self.assertEqual(
+            set(moderation_requests.values_list('version', flat=True)),
+            {self.page_version.pk} | {poll_version.pk for poll_version in unlocked_versions},
+        )
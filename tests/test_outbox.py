@@ -0,0 +1,128 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest.mock import patch
+
+from django.contrib.auth.models import Permission
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from cms.test_utils.testcases import CMSTestCase
+
+from djangocms_versioning.cms_config import VersioningCMSConfig
+from djangocms_versioning.test_utils import factories
+
+from djangocms_version_locking.models import UnlockNotification
+from djangocms_version_locking.outbox import (
+    CircuitBreaker,
+    claim_pending_notifications,
+    dispatch_notifications,
+)
+
+
+@patch('djangocms_version_locking.emails.EMAIL_NOTIFICATIONS_USE_OUTBOX', True)
+class UnlockNotificationOutboxTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.user_author = self._create_user("author", is_staff=True, is_superuser=False)
+        self.user_has_unlock_perms = self._create_user("user_has_unlock_perms", is_staff=True, is_superuser=False)
+        self.user_has_unlock_perms.user_permissions.add(Permission.objects.get(codename='delete_versionlock'))
+        self.versionable = VersioningCMSConfig.versioning[0]
+
+    def _unlock(self):
+        draft_version = factories.PageVersionFactory(content__template="", created_by=self.user_author)
+        draft_unlock_url = self.get_admin_url(self.versionable.version_model_proxy, 'unlock', draft_version.pk)
+        with self.login_user_context(self.user_has_unlock_perms):
+            self.client.post(draft_unlock_url, follow=True)
+        return draft_version
+
+    def test_unlock_queues_notification_instead_of_sending_it(self):
+        draft_version = self._unlock()
+
+        self.assertEqual(len(mail.outbox), 0)
+        notification = UnlockNotification.objects.get()
+        self.assertEqual(notification.recipient, self.user_author.email)
+        self.assertEqual(notification.title, str(draft_version.content))
+        self.assertEqual(notification.unlocked_by, self.user_has_unlock_perms.username)
+
+    def test_worker_sends_and_removes_queued_notifications(self):
+        self._unlock()
+        self._unlock()
+
+        call_command('send_unlock_notifications', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, [self.user_author.email])
+        self.assertIn(
+            "The following draft version has been unlocked by {}".format(self.user_has_unlock_perms.username),
+            mail.outbox[0].body,
+        )
+        self.assertFalse(UnlockNotification.objects.exists())
+
+    def test_failed_notification_is_rescheduled(self):
+        self._unlock()
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException):
+            delivered, failed = dispatch_notifications()
+
+        self.assertEqual((delivered, failed), (0, 1))
+        notification = UnlockNotification.objects.get()
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt, timezone.now())
+        # Not retried before the backoff delay is over
+        self.assertEqual(dispatch_notifications(), (0, 0))
+
+    def test_claimed_notifications_are_not_sent_by_another_worker(self):
+        self._unlock()
+        claimed = claim_pending_notifications()
+
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(dispatch_notifications(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+        # The claim of a worker that stopped before delivering it times out
+        UnlockNotification.objects.update(next_attempt=timezone.now())
+
+        self.assertEqual(dispatch_notifications(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_authors_without_an_email_address_are_not_queued(self):
+        self.user_author.email = ''
+        self.user_author.save()
+
+        self._unlock()
+
+        self.assertFalse(UnlockNotification.objects.exists())
+
+    def test_circuit_breaker_stops_dispatch_after_consecutive_failures(self):
+        for _ in range(3):
+            self._unlock()
+        circuit_breaker = CircuitBreaker(threshold=2, cooldown=60)
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException):
+            delivered, failed = dispatch_notifications(circuit_breaker=circuit_breaker)
+
+        self.assertEqual((delivered, failed), (0, 2))
+        self.assertTrue(circuit_breaker.is_open)
+        self.assertEqual(UnlockNotification.objects.filter(attempts=0).count(), 1)
+        # The notification that wasn't tried is released for the next batch
+        self.assertLessEqual(UnlockNotification.objects.get(attempts=0).next_attempt, timezone.now())
+
+    @patch('djangocms_version_locking.outbox.EMAIL_NOTIFICATIONS_DIGEST_WINDOW', 600)
+    def test_digest_coalesces_notifications_per_recipient(self):
+        versions = [self._unlock() for _ in range(3)]
+
+        # Nothing is sent until the oldest notification waited for the window
+        self.assertEqual(dispatch_notifications(), (0, 0))
+
+        UnlockNotification.objects.update(created=timezone.now() - timedelta(seconds=601))
+        delivered, failed = dispatch_notifications()
+
+        self.assertEqual((delivered, failed), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user_author.email])
+        self.assertIn("The following 3 draft versions have been unlocked", mail.outbox[0].body)
+        for version in versions:
+            self.assertIn(str(version.content), mail.outbox[0].body)
+        self.assertFalse(UnlockNotification.objects.exists())
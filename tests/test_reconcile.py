@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from cms.test_utils.testcases import CMSTestCase
+
+from djangocms_versioning import constants
+from djangocms_versioning.models import Version
+
+from djangocms_version_locking.helpers import get_grouping_key
+from djangocms_version_locking.models import DraftLockOwner, VersionLock
+from djangocms_version_locking.test_utils import factories
+
+
+class ReconcileVersionLocksTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.author = factories.UserFactory()
+        self.locked_drafts = factories.PollVersionFactory.create_batch(3, created_by=self.author)
+        # Drift introduced by writes bypassing Version.save
+        self.unlocked_drafts = factories.PollVersionFactory.create_batch(2, created_by=self.author)
+        VersionLock.objects.filter(version__in=self.unlocked_drafts).delete()
+        self.published = factories.PollVersionFactory(created_by=self.author)
+        Version.objects.filter(pk=self.published.pk).update(state=constants.PUBLISHED)
+        self.inactive_author = factories.UserFactory(is_active=False)
+        self.inactive_draft = factories.PollVersionFactory(created_by=self.inactive_author)
+
+    def _reconcile(self, **options):
+        stdout = StringIO()
+        call_command('reconcile_version_locks', chunk_size=2, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_drift_is_reported_without_changes(self):
+        output = self._reconcile()
+
+        self.assertIn("Drafts without a lock: 2\n", output)
+        self.assertIn("Locks of versions that aren't drafts: 1\n", output)
+        self.assertIn("Locks held by deactivated users: 1\n", output)
+        self.assertEqual(VersionLock.objects.count(), 5)
+
+    def test_drift_is_repaired(self):
+        self._reconcile(repair=True)
+
+        self.assertEqual(
+            set(VersionLock.objects.values_list('version', 'created_by')),
+            {(version.pk, self.author.pk) for version in self.locked_drafts + self.unlocked_drafts},
+        )
+        self.assertIn("Drafts without a lock: 0\n", self._reconcile())
+        self.assertIn("Locks held by deactivated users: 0\n", self._reconcile())
+
+    def test_locks_of_deactivated_users_are_reassigned(self):
+        new_owner = self.get_superuser()
+
+        self._reconcile(repair=True, reassign_to=new_owner.username)
+
+        self.assertEqual(VersionLock.objects.get(version=self.inactive_draft).created_by, new_owner)
+
+
+class ReconcileDraftRecordsTestCase(CMSTestCase):
+
+    def setUp(self):
+        self.drafts = factories.PollVersionFactory.create_batch(3)
+        # Drafts saved before the records were introduced
+        DraftLockOwner.objects.filter(version__in=self.drafts[:2]).delete()
+        self.published = factories.PollVersionFactory()
+        Version.objects.filter(pk=self.published.pk).update(state=constants.PUBLISHED)
+
+    def _reconcile(self, **options):
+        stdout = StringIO()
+        call_command('reconcile_version_locks', chunk_size=2, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_unrecorded_drafts_are_reported_without_changes(self):
+        output = self._reconcile()
+
+        self.assertIn("Drafts not recorded for their grouping: 2\n", output)
+        self.assertIn("Records of versions that aren't drafts: 1\n", output)
+        self.assertEqual(DraftLockOwner.objects.count(), 2)
+
+    def test_unrecorded_drafts_are_recorded(self):
+        self._reconcile(repair=True)
+
+        self.assertEqual(
+            dict(DraftLockOwner.objects.values_list('pk', 'version')),
+            {
+                **{get_grouping_key(version.content): version.pk for version in self.drafts},
+                get_grouping_key(self.published.content): None,
+            },
+        )
+        output = self._reconcile()
+        self.assertIn("Drafts not recorded for their grouping: 0\n", output)
+        self.assertIn("Records of versions that aren't drafts: 0\n", output)
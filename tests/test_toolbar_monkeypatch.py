@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
@@ -123,3 +125,31 @@ class VersionToolbarOverrideTestCase(CMSTestCase):
         edit_button = find_toolbar_buttons(btn_name, toolbar.toolbar)[0]
 
         self.assertEqual(edit_button.html_attributes, {'title': "Locked with {}".format(user.username)})
+
+    def test_locked_edit_button_resolves_lock_and_owner_in_one_query(self):
+        user = self.get_superuser()
+        user_2 = UserFactory(
+            is_staff=True,
+            is_superuser=True,
+            username='admin2',
+            email='admin2@123.com',
+        )
+        version = PageVersionFactory(created_by=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            toolbar = get_toolbar(version.content, user_2, content_mode=True)
+        lock_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'djangocms_version_locking_versionlock' in query['sql']
+        ]
+        btn_name = format_html(
+            '<span style="vertical-align:middle;position:relative;top:-1px" class="cms-icon cms-icon-lock"></span>{name}',  # noqa: E501
+            name=_('Edit'),
+        )
+
+        self.assertEqual(len(lock_queries), 1)
+        expected_name = user.get_full_name() or user.username
+
+        with self.assertNumQueries(0):
+            edit_button = find_toolbar_buttons(btn_name, toolbar.toolbar)[0]
+            self.assertEqual(edit_button.html_attributes, {'title': "Locked with {}".format(expected_name)})